@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+'''
+Measure the per-object overhead of GraphicEngine.display_object (type
+dispatch only: the headless backend draws nothing). The uncached isinstance
+resolution is timed as reference.
+
+usage: python bench_display_object.py [number of sprites]
+'''
+
+import sys
+import time
+
+from nurse.config import Config
+from nurse.sprite import *
+from nurse.context import Context
+
+
+def bench(func, objects, n=20):
+	'''
+    Return the best time (in us) per object of n runs of func on objects.
+	'''
+	best = None
+	for i in range(n):
+		t = time.time()
+		for obj in objects: func(None, obj)
+		t = (time.time() - t) / len(objects) * 1e6
+		if best is None or t < best: best = t
+	return best
+
+
+def main():
+	Config.backend = 'null'
+	Config.init()
+	if len(sys.argv) > 1:
+		n = int(sys.argv[1])
+	else:	n = 10000
+	context = Context('bench')
+	objects = []
+	for i in range(n):
+		if i % 10 == 0:
+			objects.append(Text('text', context))
+		else:	objects.append(Sprite('sprite', context))
+	gfx = Config.get_graphic_engine()
+
+	def uncached_display_object(screen, obj):
+		type = gfx._resolve_display_type(obj)
+		gfx.display_map[type](gfx, screen, obj)
+
+	print 'isinstance dispatch: %.3f us/object' % \
+				bench(uncached_display_object, objects)
+	print 'cached dispatch:     %.3f us/object' % \
+				bench(gfx.display_object, objects)
+
+if __name__ == "__main__" : main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+'''
+Measure the import time of nurse.config and of each backend. Only the
+selected backend toolkit should be imported by nurse.config.
+
+usage: python bench_import_time.py [backend]
+'''
+
+import sys
+import time
+import subprocess
+
+
+def time_import(statement, n=5):
+	'''
+    Return the best time (in ms) of n fresh interpreters running statement.
+	'''
+	code = 'import time; t = time.time(); %s; ' \
+		'print (time.time() - t) * 1000.' % statement
+	best = None
+	for i in range(n):
+		out = subprocess.Popen([sys.executable, '-c', code],
+				stdout=subprocess.PIPE).communicate()[0]
+		t = float(out.split()[-1])
+		if best is None or t < best: best = t
+	return best
+
+
+def main():
+	if len(sys.argv) > 1:
+		backends = sys.argv[1:]
+	else:	backends = ['null', 'sdl', 'pyglet']
+	print 'nurse.config: %.2f ms' % time_import('import nurse.config')
+	for backend in backends:
+		statement = 'from nurse.config import Config; ' \
+			'Config.backend = %r; Config._get_backend_class(1); ' \
+			'import sys; assert (%r == "sdl") == ' \
+			'("pygame" in sys.modules)' % (backend, backend)
+		print '%s backend: %.2f ms' % (backend, time_import(statement))
+
+if __name__ == "__main__" : main()
@@ -26,16 +26,13 @@ class Incrementator(Object):
 
 class Timer(Object):
 	def start(self):
-		import pyglet
-		pyglet.clock.schedule_interval ( self.tick, 1 )
-	def tick(self,dt):
-		self.emit("time_event")
-		print 'hello', dt
+		# emit "time_event" every second
+		Config.get_event_loop().timers.add_timer(1000., self,
+						"time_event", period=1000.)
 		
 #-------------------------------------------------------------------------------
 def main():
 	# init
-	Config.backend = 'pyglet'
 	Config.init()
 
 	context_manager = ContextManager()
@@ -1 +1 @@
-import base, config, context, events, screen, sprite
+import base, config, context, events, screen, sprite, timer
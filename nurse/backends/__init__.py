@@ -1,19 +1,120 @@
+import time
+from collections import deque, OrderedDict
+
 from ..base import Object
+from ..timer import TimerService
 from enum import Enum
 
+class FrameClock(object):
+	'''
+    Game time (in ms) owned by the event loop. It only moves when the loop
+    advances it, once per update, so that every sprite of a frame sees the
+    same time. Pausing and scaling apply to both animations and updates,
+    and a loop driven by fixed dt values gives a deterministic time.
+	'''
+	def __init__(self, time=0.):
+		self.time = time
+		self.scale = 1.
+		self.paused = False
+
+	def advance(self, dt):
+		'''
+    Advance the clock by dt real ms and return the elapsed game time.
+		'''
+		if self.paused: return 0.
+		dt *= self.scale
+		self.time += dt
+		return dt
+
+	def pause(self):
+		self.paused = True
+
+	def resume(self):
+		self.paused = False
+
+	def set_scale(self, scale):
+		self.scale = scale
+
+	def set_time(self, time):
+		self.time = time
+
+
 class EventLoop(Object):
-	def __init__(self, fps = 60.):
+	DROP_OLDEST = 0
+	DROP_NEWEST = 1
+	def __init__(self, fps = 60., time_budget=None, max_pending_events=None,
+					overflow_policy=DROP_OLDEST):
+		'''
+    fps : float
+        number of frames per seconds.
+    time_budget : float
+        maximum time (in ms) spent on pending events per frame. Remaining
+        events are kept for the next frame. None: no limit.
+    max_pending_events : int
+        maximum size of the event queue (at least 1). None: no limit.
+    overflow_policy : DROP_OLDEST or DROP_NEWEST
+        event dropped when the queue is full.
+		'''
+		if max_pending_events is not None and max_pending_events < 1:
+			raise ValueError('max_pending_events must be at least 1')
 		Object.__init__(self, 'event_loop')
 		self.fps = fps
-		self._pending_events = []
+		self.time_budget = time_budget
+		self.max_pending_events = max_pending_events
+		self.overflow_policy = overflow_policy
+		self._pending_events = deque()
+		self.stats = {'max_depth' : 0, 'dropped' : 0, 'processed' : 0}
+		self.clock = FrameClock()
+		self.timers = TimerService(self.clock.time)
+
+	def advance_clock(self, dt):
+		'''
+    Advance self.clock by dt real ms, emit the signals of expired timers
+    and return the elapsed game time.
+		'''
+		dt = self.clock.advance(dt)
+		self.timers.update(self.clock.time)
+		return dt
 
 	def add_event(self, event):
-		self._pending_events.append(event)
+		pending = self._pending_events
+		if self.max_pending_events is not None and \
+			len(pending) >= self.max_pending_events:
+			self.stats['dropped'] += 1
+			if self.overflow_policy == EventLoop.DROP_NEWEST: return
+			pending.popleft()
+		pending.append(event)
+		if len(pending) > self.stats['max_depth']:
+			self.stats['max_depth'] = len(pending)
 
 	def get_events(self):
-		try:
-			yield self._pending_events.pop()
-		except IndexError: pass
+		'''
+    Yield pending events in FIFO order. Events added while iterating are
+    kept for the next call.
+		'''
+		pending = self._pending_events
+		for i in xrange(len(pending)):
+			try:
+				yield pending.popleft()
+			except IndexError: return
+
+	def get_queue_depth(self):
+		return len(self._pending_events)
+
+	def process_events(self):
+		'''
+    Start pending events (FIFO) within the time budget of the frame.
+		'''
+		if self.time_budget is None:
+			deadline = None
+		else:	deadline = time.time() + self.time_budget / 1000.
+		n = 0
+		for event in self.get_events():
+			event.start()
+			n += 1
+			if deadline is not None and time.time() >= deadline:
+				break
+		self.stats['processed'] += n
 
 
 class KeyBoardDevice(Object):
@@ -43,22 +144,193 @@ class ImageProxy(object):
 		return self._raw_image
 
 
+class ImageCache(object):
+	'''
+    Shared, reference-counted cache of decoded images.
+
+    Unreferenced images are kept until the cache exceeds its budget, then
+    evicted in least recently used order.
+	'''
+	def __init__(self, max_bytes=None, max_entries=None, on_remove=None):
+		'''
+    max_bytes :   memory budget (approximated from image sizes in RGBA).
+                  None: no limit.
+    max_entries : maximum number of images. None: no limit.
+    on_remove :   on_remove(key, image) is called when an image is evicted
+                  or cleared. None: no call.
+		'''
+		self.max_bytes = max_bytes
+		self.max_entries = max_entries
+		self.on_remove = on_remove
+		self._entries = OrderedDict() # key -> [image, nbytes, refcount]
+		self.nbytes = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, key):
+		return key in self._entries
+
+	def acquire(self, key, loader, sizeof):
+		'''
+    Return the image stored for key, loading it with loader() on a miss.
+    sizeof(image) gives its size in bytes. Each call must be balanced by a
+    call to release(key) when the image is no longer used.
+		'''
+		entries = self._entries
+		try:
+			entry = entries.pop(key)
+			self.hits += 1
+		except KeyError:
+			image = loader()
+			entry = [image, sizeof(image), 0]
+			self.nbytes += entry[1]
+			self.misses += 1
+		entry[2] += 1
+		entries[key] = entry # most recently used
+		self._evict()
+		return entry[0]
+
+	def release(self, key):
+		entry = self._entries[key]
+		entry[2] -= 1
+		self._evict()
+
+	def _is_full(self):
+		return (self.max_bytes is not None and \
+			self.nbytes > self.max_bytes) or \
+			(self.max_entries is not None and \
+			len(self._entries) > self.max_entries)
+
+	def _evict(self):
+		if not self._is_full(): return
+		for key, entry in self._entries.items():
+			if entry[2] > 0: continue
+			self._remove(key)
+			self.evictions += 1
+			if not self._is_full(): break
+
+	def clear(self):
+		'''
+    Drop every unreferenced image.
+		'''
+		for key, entry in self._entries.items():
+			if entry[2] == 0: self._remove(key)
+
+	def _remove(self, key):
+		image, nbytes, refcount = self._entries.pop(key)
+		self.nbytes -= nbytes
+		if self.on_remove is not None: self.on_remove(key, image)
+
+	def get_stats(self):
+		return {'entries' : len(self._entries), 'bytes' : self.nbytes,
+			'hits' : self.hits, 'misses' : self.misses,
+			'evictions' : self.evictions}
+
+
 class GraphicEngine(object):
 	# GraphicEngine and derivated classes are singletons
 	instances = {}
+	image_cache_max_bytes = 256 * 2 ** 20
+	text_cache_max_entries = 256
+	text_width_cache_max_entries = 4096
 
 	def __new__(cls, *args, **kwargs):
 		if GraphicEngine.instances.get(cls) is None:
 			GraphicEngine.instances[cls] = object.__new__(cls)
 		return GraphicEngine.instances[cls]
 
-	def display_context(self, screen, context):
+	def __init__(self):
+		self.image_cache = ImageCache(self.image_cache_max_bytes,
+					on_remove=self._on_image_removed)
+		self.atlas = None
+		# class of displayed object -> (type, display function)
+		self._display_cache = {}
+		self._frame_time = 0.
+		self._text_cache = OrderedDict() # (text, font, size) -> label
+		self._text_widths = OrderedDict() # (text, font, size) -> width
+
+	def enable_atlas(self, width=1024, height=1024, padding=1):
+		'''
+    Pack the next loaded images in texture atlas sheets (see
+    nurse.backends.atlas.TextureAtlas).
+		'''
+		from atlas import TextureAtlas
+		self.atlas = TextureAtlas(self, width, height, padding)
+
+	def _on_image_removed(self, key, raw_image):
+		# regions of dropped images give their sheets back
+		if self.atlas is not None: self.atlas.release(key)
+
+	def display_context(self, screen, context, time=None):
+		'''
+    time: frame time (in ms) used to select animation frames.
+          Default: current time of the event loop clock.
+		'''
+		self.display_screens([screen], context, time)
+
+	def display_screens(self, screens, context, time=None):
+		'''
+    Draw context on each of the given virtual screens. Frames and draw
+    commands of the visible objects are resolved once, then replayed on
+    each screen with its own referential.
+
+    time: frame time (in ms), see display_context.
+		'''
+		if time is None: time = self.get_ticks()
+		self._frame_time = time
 		data = context.get_visible_data()
-		for layer, objects in data.items(): # from bg to fg
-			for obj in objects:
-				self.display_object(screen, obj)
-	
-	def display_object(self, screen, obj):
+		commands = {} # obj -> draw command, shared by the screens
+		for screen in screens:
+			self._begin_screen(screen)
+			# from bg to fg, without sprites out of the screen view
+			draw_list = data.get_draw_list(screen.get_view_rect())
+			self._replay_commands(screen, draw_list, commands)
+
+	def _begin_screen(self, screen):
+		'''
+    Prepare the drawing on screen (transform, clipping), if needed.
+		'''
+		pass
+
+	def _get_draw_command(self, obj):
+		'''
+    Return (display function, obj, None) or, for sprites,
+    (None, raw image, (location, center)), or None if there is nothing to
+    draw.
+		'''
+		type, display = self._get_display_infos(obj)
+		if type != 'sprite': return display, obj, None
+		frame_proxy, center = obj.get_frame_infos(self._frame_time)
+		if frame_proxy is None: return None
+		return None, frame_proxy.get_raw_image(), \
+					(obj.get_location(), center)
+
+	def _replay_commands(self, screen, draw_list, commands):
+		for obj in draw_list:
+			try:
+				command = commands[obj]
+			except KeyError:
+				command = self._get_draw_command(obj)
+				commands[obj] = command
+			if command is None: continue
+			display, item, pos = command
+			if display is None:
+				self.draw_image(screen, item, *pos)
+			else:	display(self, screen, item)
+
+	def draw_image(self, screen, raw_image, location, center=(0, 0)):
+		'''
+    Draw a raw image of the backend on screen, its center point (in image
+    pixels from the top left corner) being at location (in world
+    coordinates).
+		'''
+		raise NotImplementedError
+
+	def _resolve_display_type(self, obj):
 		# FIXME: move somewherelse
 		from ..sprite import FpsSprite, Text, Sprite 
 		from ..game.dialog import Dialog
@@ -71,12 +343,44 @@ class GraphicEngine(object):
 		elif isinstance(obj, Sprite):
 			type = 'sprite'
 		else:	type = None
-		self.display_map[type](self, screen, obj)
+		return type
+
+	def _get_display_infos(self, obj):
+		'''
+    Return (type, display function) of obj, resolved once per class.
+		'''
+		cls = obj.__class__
+		try:
+			return self._display_cache[cls]
+		except KeyError:
+			pass
+		type = self._resolve_display_type(obj)
+		infos = type, self.display_map[type]
+		self._display_cache[cls] = infos
+		return infos
+
+	def get_display_type(self, obj):
+		'''
+    Return the key of display_map used to display obj.
+		'''
+		return self._get_display_infos(obj)[0]
+
+	def display_object(self, screen, obj):
+		try:
+			display = self._display_cache[obj.__class__][1]
+		except KeyError:
+			display = self._get_display_infos(obj)[1]
+		display(self, screen, obj)
+
+	def get_ticks(self):
+		'''
+    Return the current time (in ms) of the event loop clock.
+		'''
+		from ..config import Config
+		return Config.get_event_loop().clock.time
 
 	def display_sprite(self, screen, sprite):
-		import pygame # FIXME : replace
-		time = pygame.time.get_ticks()
-		frame_proxy, center = sprite.get_frame_infos(time)
+		frame_proxy, center = sprite.get_frame_infos(self._frame_time)
 		if frame_proxy is None: return
 		raw_img = frame_proxy.get_raw_image()
 		dst_pos = screen.get_ref() + sprite.get_location() - center
@@ -93,10 +397,108 @@ class GraphicEngine(object):
 				font_size=20, x=0, y=0):
 		raise NotImplementedError
 
+	def get_cached_text(self, text, font='Times New Roman', font_size=20):
+		'''
+    Return a text label shared by every caller using the same text, font
+    and size (least recently used labels are dropped). Its position must
+    be set with move_text before each draw.
+		'''
+		key = (text, font, font_size)
+		cache = self._text_cache
+		try:
+			label = cache.pop(key)
+		except KeyError:
+			label = self.load_text(text, font, font_size)
+		cache[key] = label
+		if len(cache) > self.text_cache_max_entries:
+			cache.popitem(last=False)
+		return label
+
+	def get_text_width(self, text, font='Times New Roman', font_size=20):
+		'''
+    Return the width of text once laid out. The text_width_cache_max_entries
+    most recently used widths are kept, so that words can be measured for
+    each wrapped line for free.
+		'''
+		key = (text, font, font_size)
+		widths = self._text_widths
+		try:
+			width = widths.pop(key)
+		except KeyError:
+			width = self.load_text(text, font, font_size).content_width
+		widths[key] = width
+		if len(widths) > self.text_width_cache_max_entries:
+			widths.popitem(last=False)
+		return width
+
+	def load_typing_text(self, text, font='Times New Roman',
+				font_size=20, x=0, y=0):
+		'''
+    Return a one line label laid out once for the whole text, with no
+    visible character. Its reveal(n) method shows the n first characters.
+		'''
+		raise NotImplementedError
+
+	def move_text(self, label, x, y):
+		'''
+    Move a label returned by load_text or get_cached_text, if needed.
+		'''
+		if label.x != x or label.y != y:
+			label.x, label.y = x, y
+
 	def load_image(self, filename):
+		'''
+    Return an image proxy for the given file. Decoded images are shared
+    through self.image_cache: call release_image(proxy) when the proxy is
+    no longer used.
+		'''
+		key = (filename,) + self._get_image_load_options()
+		if self.atlas is None:
+			loader = lambda : self._decode_image(filename)
+		else:
+			# only the packed region is cached: the decoded image
+			# is dropped once copied in its sheet
+			loader = lambda : self.atlas.get_region(key,
+					lambda : self._decode_image(filename))
+		raw = self.image_cache.acquire(key, loader,
+						self._get_image_nbytes)
+		proxy = self._make_image_proxy(raw)
+		proxy._cache_key = key
+		return proxy
+
+	def release_image(self, proxy):
+		'''
+    Release a proxy returned by load_image. Other proxies are ignored.
+		'''
+		key = getattr(proxy, '_cache_key', None)
+		if key is not None: self.image_cache.release(key)
+
+	def _get_image_load_options(self):
+		'''
+    Return a tuple of the options changing the result of _decode_image.
+		'''
+		return ()
+
+	def _decode_image(self, filename):
+		'''
+    Return the backend image decoded from filename.
+		'''
+		raise NotImplementedError
+
+	def _make_image_proxy(self, raw_image):
+		raise NotImplementedError
+
+	def _get_raw_image_size(self, raw_image):
+		return self._make_image_proxy(raw_image).get_size()
+
+	def _get_image_nbytes(self, raw_image):
+		width, height = self._get_raw_image_size(raw_image)
+		return width * height * 4
+
+	def _create_atlas_sheet(self, width, height):
 		raise NotImplementedError
 
-	def load_image(self, filename):	
+	def _add_to_atlas_sheet(self, sheet, raw_image, x, y):
 		raise NotImplementedError
 
 	def get_uniform_surface(self, shift=(0, 0), size=None,
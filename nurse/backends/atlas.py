@@ -0,0 +1,146 @@
+''' Texture atlases: many small images packed in a few large sheets.
+.. module:: atlas
+'''
+
+
+class SkylinePacker(object):
+	'''
+    Online rectangle bin packing (skyline bottom-left heuristic).
+
+    The skyline is the list of (x, y, width) segments giving the height of
+    the packed area on each abscissa. A rectangle is placed where its top
+    is the lowest, then the leftmost.
+	'''
+	def __init__(self, width, height):
+		self.width = width
+		self.height = height
+		self._skyline = [(0, 0, width)]
+
+	def _fit(self, i, width, height):
+		'''
+    Return the y position of a rectangle whose left border is on the i-th
+    segment, or None if it does not fit.
+		'''
+		x = self._skyline[i][0]
+		if x + width > self.width: return None
+		y = 0
+		remaining = width
+		while remaining > 0:
+			sx, sy, sw = self._skyline[i]
+			if sy > y: y = sy
+			if y + height > self.height: return None
+			remaining -= sw
+			i += 1
+		return y
+
+	def pack(self, width, height):
+		'''
+    Return the (x, y) position of the rectangle in the bin, or None if the
+    bin is full.
+		'''
+		best = None
+		for i in range(len(self._skyline)):
+			y = self._fit(i, width, height)
+			if y is None: continue
+			x = self._skyline[i][0]
+			if best is None or (y + height, x) < (best[2] + height,
+								best[1]):
+				best = (i, x, y)
+		if best is None: return None
+		i, x, y = best
+		self._add_segment(i, x, y + height, width)
+		return x, y
+
+	def _add_segment(self, i, x, y, width):
+		skyline = self._skyline
+		skyline.insert(i, (x, y, width))
+		# shrink or remove the segments covered by the new one
+		right = x + width
+		j = i + 1
+		while j < len(skyline):
+			sx, sy, sw = skyline[j]
+			if sx >= right: break
+			if sx + sw <= right:
+				del skyline[j]
+			else:
+				skyline[j] = (right, sy, sx + sw - right)
+				break
+		# merge neighbour segments of the same height
+		j = 0
+		while j < len(skyline) - 1:
+			sx, sy, sw = skyline[j]
+			nx, ny, nw = skyline[j + 1]
+			if sy == ny:
+				skyline[j] = (sx, sy, sw + nw)
+				del skyline[j + 1]
+			else:	j += 1
+
+
+class TextureAtlas(object):
+	'''
+    Pack images in sheets of a graphic engine. Each packed image is replaced
+    by a sub-region view of its sheet, so that images of a same sheet share
+    one texture.
+
+    The graphic engine provides:
+    - _create_atlas_sheet(width, height): a new empty sheet.
+    - _add_to_atlas_sheet(sheet, raw_image, x, y): copy raw_image in sheet
+      at (x, y) and return the raw sub-region.
+    - _get_raw_image_size(raw_image).
+	'''
+	def __init__(self, engine, width=1024, height=1024, padding=1):
+		self._engine = engine
+		self.width = width
+		self.height = height
+		self.padding = padding
+		self._sheets = [] # list of [sheet, packer, number of regions]
+		self._regions = {} # key -> (region, sheet entry)
+
+	def __len__(self):
+		return len(self._regions)
+
+	def get_sheets(self):
+		return [entry[0] for entry in self._sheets]
+
+	def get_region(self, key, loader):
+		'''
+    Return the sub-region view of the sheet holding the image stored for
+    key, packing the image returned by loader() on the first request.
+    Images bigger than a sheet are returned unchanged.
+		'''
+		try:
+			return self._regions[key][0]
+		except KeyError:
+			pass
+		raw_image = loader()
+		width, height = self._engine._get_raw_image_size(raw_image)
+		p = self.padding
+		if width + p > self.width or height + p > self.height:
+			return raw_image
+		for entry in self._sheets:
+			pos = entry[1].pack(width + p, height + p)
+			if pos is not None: break
+		else:
+			sheet = self._engine._create_atlas_sheet(self.width,
+								self.height)
+			entry = [sheet, SkylinePacker(self.width, self.height), 0]
+			self._sheets.append(entry)
+			pos = entry[1].pack(width + p, height + p)
+		region = self._engine._add_to_atlas_sheet(entry[0], raw_image,
+									*pos)
+		entry[2] += 1
+		self._regions[key] = region, entry
+		return region
+
+	def release(self, key):
+		'''
+    Forget the region stored for key (unknown keys are ignored). The area
+    of a region is not reused, but a sheet is dropped with its pixels once
+    all its regions are released.
+		'''
+		try:
+			region, entry = self._regions.pop(key)
+		except KeyError:
+			return
+		entry[2] -= 1
+		if entry[2] == 0: self._sheets.remove(entry)
@@ -0,0 +1,198 @@
+import os
+import time
+import struct
+from collections import deque
+
+from nurse.backends import EventLoop, KeyBoardDevice, GraphicEngine, ImageProxy
+from nurse.base import universe
+
+
+class NullEventLoop(EventLoop):
+	'''
+    Headless event loop: no window, no OS events. Time is virtual: each tick
+    advances self.clock by 1000 / fps ms, as fast as possible unless realtime
+    is True.
+	'''
+	def __init__(self, fps = 60., realtime=False, *args, **kwargs):
+		EventLoop.__init__(self, fps, *args, **kwargs)
+		self.realtime = realtime
+		self.ticks = 0
+		self._running = False
+
+	def start(self, max_ticks=None):
+		'''
+    Run the loop until stop() is called or max_ticks ticks are done.
+		'''
+		self._running = True
+		while self._running:
+			if max_ticks is not None and self.ticks >= max_ticks: break
+			step = 1000. / self.fps
+			if self.realtime:
+				begin = time.time()
+				self.tick(step)
+				delay = step / 1000. - (time.time() - begin)
+				if delay > 0: time.sleep(delay)
+			else:	self.tick(step)
+		self._running = False
+
+	def stop(self):
+		self._running = False
+
+	def tick(self, dt):
+		'''
+    Run one frame of dt ms on the virtual clock.
+		'''
+		self.ticks += 1
+		self.read_events()
+		universe.context_manager.update(self.advance_clock(dt))
+		universe.context_manager.display()
+
+	def read_events(self):
+		from nurse.config import Config
+		self.process_events()
+		Config.get_keyboard_device().read_events()
+
+
+class NullKeyBoardDevice(KeyBoardDevice):
+	'''
+    Keyboard without hardware: key events are pushed by scripts (replays,
+    tests) and emitted on the next read_events call.
+	'''
+	def __init__(self):
+		KeyBoardDevice.__init__(self)
+		self._scripted_events = deque()
+
+	def push_event(self, type, key):
+		'''
+    type : KeyBoardDevice.constants.KEYDOWN or KEYUP
+    key :  KeyBoardDevice.constants.K_* value
+		'''
+		self._scripted_events.append((type, key))
+
+	def read_events(self):
+		events = self._scripted_events
+		while events:
+			self.emit(events.popleft())
+
+
+class NullImageProxy(ImageProxy):
+	def __init__(self, raw_image=None, size=(0, 0)):
+		ImageProxy.__init__(self, raw_image)
+		self._size = tuple(size)
+
+	def get_size(self):
+		return self._size
+
+	def get_width(self):
+		return self._size[0]
+
+	def get_height(self):
+		return self._size[1]
+
+
+class NullLabel(object):
+	'''
+    Stands for a backend text label: only an approximate layout is kept.
+	'''
+	def __init__(self, text, font, font_size, x, y):
+		self.text = text
+		self.font_name = font
+		self.font_size = font_size
+		self.x = x
+		self.y = y
+		self.content_width = len(text) * font_size / 2
+		self.content_height = font_size
+
+	def draw(self):
+		pass
+
+
+class NullTypingText(NullLabel):
+	def __init__(self, text, font, font_size, x, y):
+		NullLabel.__init__(self, text, font, font_size, x, y)
+		self.revealed = 0
+
+	def reveal(self, n):
+		self.revealed = n
+
+
+class NullGraphicEngine(GraphicEngine):
+	'''
+    Graphic engine which renders nothing. Image sizes are read from PNG
+    headers when available so that sprite bounding boxes stay meaningful.
+	'''
+	display_map = {}
+
+	def __init__(self, resolution):
+		GraphicEngine.__init__(self)
+		self._resolution = tuple(resolution)
+		# for examples TODO: find a better way
+		self._img_paths = ['../data/pix', 'data/pix']
+		self._atlas_sheets = 0 # number of created atlas sheets
+
+	def display_screens(self, screens, context, time=None):
+		pass
+
+	def draw_image(self, screen, raw_image, location, center=(0, 0)):
+		pass
+
+	def display_nothing(self, screen, obj):
+		pass
+
+	def flip(self):
+		pass
+
+	def clean(self):
+		pass
+
+	def _read_image_size(self, filename):
+		for path in self._img_paths:
+			fullname = os.path.join(path, filename)
+			if not os.path.exists(fullname): continue
+			f = open(fullname, 'rb')
+			try:
+				header = f.read(24)
+			finally:
+				f.close()
+			if header[:8] == '\x89PNG\r\n\x1a\n':
+				return struct.unpack('>II', header[16:24])
+		return 0, 0
+
+	def _decode_image(self, filename):
+		return filename, self._read_image_size(filename)
+
+	def _make_image_proxy(self, raw_image):
+		filename, size = raw_image
+		return NullImageProxy(filename, size)
+
+	def _create_atlas_sheet(self, width, height):
+		self._atlas_sheets += 1
+		return 'atlas_sheet_%d' % (self._atlas_sheets - 1), \
+							(width, height)
+
+	def _add_to_atlas_sheet(self, sheet, raw_image, x, y):
+		filename, size = raw_image
+		return (sheet[0], (x, y), filename), size
+
+	def load_text(self, text, font='Times New Roman',
+				font_size=20, x=0, y=0):
+		return NullLabel(text, font, font_size, x, y)
+
+	def load_typing_text(self, text, font='Times New Roman',
+				font_size=20, x=0, y=0):
+		return NullTypingText(text, font, font_size, x, y)
+
+	def get_uniform_surface(self, shift=(0, 0), size=None,
+				color=(0, 0, 0), alpha=128):
+		if size is None: size = self._resolution
+		return NullImageProxy(None, size)
+
+	def get_screen(self):
+		return NullImageProxy(None, self._resolution)
+
+
+NullGraphicEngine.display_map.update({ \
+	'sprite' : NullGraphicEngine.display_nothing,
+	'dialog' : NullGraphicEngine.display_nothing,
+	'text' : NullGraphicEngine.display_nothing,
+	'fps' : NullGraphicEngine.display_nothing})
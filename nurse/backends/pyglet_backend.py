@@ -6,8 +6,8 @@ from nurse.backends import EventLoop, KeyBoardDevice, GraphicEngine, ImageProxy
 from nurse.base import universe
 
 class PygletEventLoop(EventLoop):
-	def __init__(self, fps = 60.):
-		EventLoop.__init__(self, fps)
+	def __init__(self, fps = 60., *args, **kwargs):
+		EventLoop.__init__(self, fps, *args, **kwargs)
 
 	def start(self):
 		pyglet.clock.schedule_interval(self.update, 1. / self.fps)
@@ -18,16 +18,14 @@ class PygletEventLoop(EventLoop):
     dt : delay in seconds between 2 calls of this method
                 '''
 		self.read_events()
-		universe.context_manager.update(dt * 1000.)
+		universe.context_manager.update(self.advance_clock(dt * 1000.))
 
 	@classmethod
 	def on_draw(cls):
 		universe.context_manager.display()
 
 	def read_events(self):
-		if len(self._pending_events) != 0:
-			e = self._pending_events.pop()
-			e.start()
+		self.process_events()
 
 
 class PygletKeyBoardDevice(KeyBoardDevice):
@@ -159,11 +157,110 @@ class PygletUniformSurface(object):
 		glPopMatrix()
 
 
+class PygletTypingText(object):
+	'''
+    One line of text laid out once in an IncrementalTextLayout. Characters
+    are revealed by restyling their range, which only updates the vertices
+    of the revealed glyphs instead of laying out the line again.
+	'''
+	hidden_color = (255, 255, 255, 0)
+	visible_color = (255, 255, 255, 255)
+
+	def __init__(self, text, font, font_size, x, y, width):
+		document = pyglet.text.document.FormattedDocument(text)
+		document.set_style(0, len(text), dict(font_name=font,
+			font_size=font_size, color=self.hidden_color))
+		self.document = document
+		# one line never needs more than twice the font size
+		self.layout = pyglet.text.layout.IncrementalTextLayout(document,
+				width, 2 * font_size, multiline=False)
+		self.layout.anchor_y = 'baseline'
+		self.layout.x, self.layout.y = x, y
+		self.revealed = 0
+
+	def _get_content_height(self):
+		return self.layout.content_height
+
+	content_height = property(_get_content_height)
+
+	def _get_y(self):
+		return self.layout.y
+
+	def _set_y(self, y):
+		self.layout.y = y
+
+	y = property(_get_y, _set_y)
+
+	def reveal(self, n):
+		if n > self.revealed:
+			self.document.set_style(self.revealed, n,
+					dict(color=self.visible_color))
+		elif n < self.revealed:
+			self.document.set_style(n, self.revealed,
+					dict(color=self.hidden_color))
+		self.revealed = n
+
+	def draw(self):
+		self.layout.draw()
+
+
+class PygletSpriteRun(object):
+	'''
+    Persistent batch of a run of consecutive pyglet sprites of a layer.
+
+    A batch draws sprites sharing a texture (e.g. an atlas sheet) in
+    allocation order: sprites are appended in the order of the layer, and
+    the batch is rebuilt when a sprite would be drawn out of order.
+	'''
+	def __init__(self):
+		self.batch = pyglet.graphics.Batch()
+		self._members = [] # sprites in allocation order
+		self._ranks = {} # sprite -> index in self._members
+
+	def remove(self, raw):
+		self._members.remove(raw)
+		self._ranks = dict((raw, i) for i, raw in \
+					enumerate(self._members))
+
+	def set_sprites(self, sprites):
+		'''
+    Make sure the given sprites, in drawing order, are members of the
+    batch. Hidden members are kept.
+		'''
+		ranks = self._ranks
+		last = -1
+		for raw in sprites:
+			rank = ranks.get(raw)
+			if rank is None:
+				last = len(self._members)
+				ranks[raw] = last
+				self._members.append(raw)
+				raw.batch = self.batch
+			elif rank > last:
+				last = rank
+			else:
+				self._rebuild(sprites)
+				return
+
+	def _rebuild(self, sprites):
+		members = list(sprites)
+		shown = set(sprites)
+		members.extend(raw for raw in self._members if raw not in shown)
+		self.batch = pyglet.graphics.Batch()
+		for raw in members: raw.batch = self.batch
+		self._members = members
+		self._ranks = dict((raw, i) for i, raw in enumerate(members))
+
+
 class PygletGraphicEngine(GraphicEngine):
 	display_map = {}
+	# draw pyglet sprites of each context layer with persistent batches
+	batch_rendering = True
 	
 	def __init__(self, resolution, caption):
 		GraphicEngine.__init__(self)
+		# context -> layer -> (list of PygletSpriteRun, sprite -> run)
+		self._layer_batches = {}
 		# for examples TODO: find a better way
 		pyglet.resource.path.append('../data/pix')
 		# for games: standard path
@@ -176,7 +273,7 @@ class PygletGraphicEngine(GraphicEngine):
 	def _invert_y_axis(self, img_height, pos_y):
 		return self._win.height - pos_y - img_height
 
-	def display_context(self, screen, context):
+	def _begin_screen(self, screen):
 		# clipping according to screen geometry
 		x, y, width, height = screen.geometry
 		glViewport(x, y, width, height)
@@ -186,7 +283,107 @@ class PygletGraphicEngine(GraphicEngine):
 		glOrtho(x, x + width, y, y + height, -1, 1)
 		glMatrixMode(GL_MODELVIEW)
 
-		GraphicEngine.display_context(self, screen, context)
+	def display_screens(self, screens, context, time=None):
+		'''
+    With batch_rendering, the sprites seen by at least one of the screens
+    are placed and batched once per frame (see _prepare_layer), then the
+    same batches are drawn on each screen, clipped by its viewport.
+		'''
+		if not self.batch_rendering:
+			GraphicEngine.display_screens(self, screens, context, time)
+			return
+		if time is None: time = self.get_ticks()
+		self._frame_time = time
+		data = context.get_visible_data()
+		try:
+			layer_batches = self._layer_batches[context]
+		except KeyError:
+			layer_batches = self._layer_batches[context] = {}
+		views = tuple(screen.get_view_rect() for screen in screens)
+		frames = {} # obj -> frame infos
+		sequences = []
+		shown = set()
+		# from bg to fg, culled sprites are hidden from the batches
+		for layer, objects in data.items_in_views(views):
+			sequences.append(self._prepare_layer(layer_batches,
+						layer, objects, frames))
+			shown.add(layer)
+		for layer, (runs, owners) in layer_batches.iteritems():
+			if layer in shown: continue
+			for raw in owners:
+				if raw.visible: raw.visible = False
+		for screen in screens:
+			self._begin_screen(screen)
+			for sequence in sequences:
+				self._draw_sequence(screen, sequence)
+
+	def _prepare_layer(self, layer_batches, layer, objects, frames):
+		'''
+    Place the pyglet sprites of a context layer in persistent batches, one
+    per run of consecutive sprites (see PygletSpriteRun). Sprites are added
+    once and only moved afterwards. Return the drawing sequence of the
+    layer: other objects and runs, in order.
+
+    layer_batches: layer -> (list of PygletSpriteRun, sprite -> run)
+    frames: dict of frame infos of the sprites, filled on first use.
+		'''
+		try:
+			runs, owners = layer_batches[layer]
+		except KeyError:
+			runs, owners = layer_batches[layer] = [], {}
+		visible = set()
+		sequence = [] # objects and lists of sprites, in drawing order
+		for obj in objects:
+			raw = None
+			if self.get_display_type(obj) == 'sprite':
+				try:
+					frame_proxy, center = frames[obj]
+				except KeyError:
+					frame_proxy, center = \
+						obj.get_frame_infos(self._frame_time)
+					frames[obj] = frame_proxy, center
+				if frame_proxy is None: continue
+				raw = frame_proxy.get_raw_image()
+			if not isinstance(raw, pyglet.sprite.Sprite):
+				sequence.append(obj)
+				continue
+			if not sequence or not isinstance(sequence[-1], list):
+				sequence.append([])
+			sequence[-1].append(raw)
+			if not raw.visible: raw.visible = True
+			visible.add(raw)
+			# world coordinates, y axis inverted, see _draw_sequence
+			location = obj.get_location()
+			pos = (location[0] - center[0],
+				center[1] - location[1] - raw.height)
+			if raw.position != pos: raw.set_position(*pos)
+		for raw in owners:
+			if raw not in visible and raw.visible: raw.visible = False
+		i = 0
+		for n, item in enumerate(sequence):
+			if not isinstance(item, list): continue
+			if i == len(runs): runs.append(PygletSpriteRun())
+			run = runs[i]
+			i += 1
+			for raw in item:
+				owner = owners.get(raw)
+				if owner is not run and owner is not None:
+					owner.remove(raw)
+				owners[raw] = run
+			run.set_sprites(item)
+			sequence[n] = run
+		return sequence
+
+	def _draw_sequence(self, screen, sequence):
+		ref = screen.get_ref()
+		for item in sequence:
+			if not isinstance(item, PygletSpriteRun):
+				self.display_object(screen, item)
+				continue
+			glPushMatrix()
+			glTranslatef(ref[0], self._win.height - ref[1], 0)
+			item.batch.draw()
+			glPopMatrix()
 
 	def display_sprite(self, screen, sprite):
 		sprite, dst_pos, src_rect = GraphicEngine.display_sprite(self,
@@ -195,13 +392,22 @@ class PygletGraphicEngine(GraphicEngine):
 		sprite.set_position(*dst_pos)
 		sprite.draw()
 
+	def draw_image(self, screen, raw_image, location, center=(0, 0)):
+		x, y = screen.get_ref() + location - center
+		raw_image.set_position(x,
+			self._invert_y_axis(raw_image.height, y))
+		raw_image.draw()
+
 	def display_dialog(self, screen, dialog):
 		repr_list = dialog._current_state.list_backend_repr
 		for repr in repr_list: repr.draw()
 
 	def display_text(self, screen, text):
 		repr = text.backend_repr
-		if repr is not None: repr.draw()
+		if repr is None: return
+		x, y = text.get_location()
+		self.move_text(repr, x, y)
+		repr.draw()
 
 	def display_fps(self, screen, fps):
 		pos = list(fps.get_location())
@@ -223,10 +429,28 @@ class PygletGraphicEngine(GraphicEngine):
 		surface = PygletUniformSurface(shift, size, color, alpha)
 		return PygletImageProxy(surface)
 
-	def load_image(self, filename):
-		img = pyglet.resource.image(filename)
-		sprite = pyglet.sprite.Sprite(img, 0, 0)
-		return PygletImageProxy(sprite)
+	def _decode_image(self, filename):
+		return pyglet.resource.image(filename)
+
+	def _make_image_proxy(self, img):
+		# pyglet sprites hold a position: one per proxy, sharing img
+		return PygletImageProxy(pyglet.sprite.Sprite(img, 0, 0))
+
+	def _get_raw_image_size(self, img):
+		return img.width, img.height
+
+	def _get_image_nbytes(self, img):
+		return img.width * img.height * 4
+
+	def _create_atlas_sheet(self, width, height):
+		return pyglet.image.Texture.create(width, height)
+
+	def _add_to_atlas_sheet(self, sheet, img, x, y):
+		sheet.blit_into(img.get_image_data(), x, y, 0)
+		region = sheet.get_region(x, y, img.width, img.height)
+		# keep sprite centers as with the standalone image
+		region.anchor_x, region.anchor_y = img.anchor_x, img.anchor_y
+		return region
 
 	def load_text(self, text, font='Times New Roman',
 				font_size=20, x=0, y=0):
@@ -235,6 +459,20 @@ class PygletGraphicEngine(GraphicEngine):
 		label.y = self._invert_y_axis(label.content_height, y)
 		return label
 
+	def load_typing_text(self, text, font='Times New Roman',
+				font_size=20, x=0, y=0):
+		label = PygletTypingText(text, font, font_size, x, y,
+							self._win.width)
+		label.y = self._invert_y_axis(label.content_height, y)
+		return label
+
+	def move_text(self, label, x, y):
+		y = self._invert_y_axis(label.content_height, y)
+		if label.x != x or label.y != y:
+			label.begin_update()
+			label.x, label.y = x, y
+			label.end_update()
+
 	def shift_text(self, text, shift):
 		repr_list = text.list_backend_repr
 		for repr in repr_list: repr.y += shift
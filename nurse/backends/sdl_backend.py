@@ -1,32 +1,76 @@
+import os
 import sys
+import math
 import pygame
 
 from nurse.backends import EventLoop, KeyBoardDevice, GraphicEngine, ImageProxy
+from nurse.base import universe
 
 
 class SdlEventLoop(EventLoop):
-	def __init__(self, fps = 60.):
-		EventLoop.__init__(self, fps)
+	def __init__(self, fps = 60., *args, **kwargs):
+		'''
+    fps : float
+        number of updates per seconds (fixed timestep).
+    max_catch_up : int (keyword only, default: 5)
+        maximum number of updates run before a display when the loop is
+        late. Beyond this limit late frames are skipped.
 
-	def start(self):
-		previous_time = pygame.time.get_ticks()
+    Other arguments: see EventLoop.
+		'''
+		max_catch_up = kwargs.pop('max_catch_up', 5)
+		EventLoop.__init__(self, fps, *args, **kwargs)
+		self.max_catch_up = max_catch_up
+		self.skipped_frames = 0
 
+	def start(self):
+		next_time = pygame.time.get_ticks()
 		while 1:
 			self.read_events()
 			time = pygame.time.get_ticks()
-			dt = time - previous_time
-			if dt < (1000. / self.fps): continue
-			previous_time = time
-			self.update(dt)
+			if time < next_time:
+				self._wait(next_time - time)
+				continue
+			# fixed timestep updates, variable display
+			step = 1000. / self.fps
+			n = 0
+			while time >= next_time and n < self.max_catch_up:
+				self.update(step)
+				next_time += step
+				n += 1
+			if time >= next_time:
+				# overload: skip late frames
+				self.skipped_frames += int((time - next_time) / step) + 1
+				next_time = time + step
+			self.display()
+
+	def _wait(self, delay):
+		'''
+    Sleep until delay (in ms) is elapsed or an OS event is received.
+		'''
+		from nurse.config import Config
+		# a 0 timeout would wait for an event without time limit
+		timeout = max(1, int(math.ceil(delay)))
+		try:
+			event = pygame.event.wait(timeout)
+		except TypeError:
+			# pygame < 2: no timeout, just sleep
+			pygame.time.wait(timeout)
+			return
+		# the event was the oldest of the queue: handled right now to
+		# keep the order of events
+		if event.type != pygame.constants.NOEVENT:
+			Config.get_keyboard_device().handle_event(event)
 
 	def update(self, dt):
+		universe.context_manager.update(self.advance_clock(dt))
+
+	def display(self):
 		universe.context_manager.display()
-		universe.context_manager.update(dt)
 
 	def read_events(self):
-		if len(self._pending_events) != 0:
-			e = self._pending_events.pop()
-			e.start()
+		from nurse.config import Config
+		self.process_events()
 		Config.get_keyboard_device().read_events()
 
 
@@ -51,6 +95,12 @@ class SdlKeyBoardDevice(KeyBoardDevice):
 	def read_events(self):
 		event = pygame.event.poll()
 		if (event.type == 0): return
+		self.handle_event(event)
+
+	def handle_event(self, event):
+		'''
+    Handle an event taken from the pygame queue.
+		'''
 		keystate = pygame.key.get_pressed()
 		if (event.type == pygame.constants.QUIT): sys.exit(0)
 		if (event.type == pygame.constants.KEYDOWN):
@@ -85,9 +135,20 @@ class SdlImageProxy(ImageProxy):
 
 class SdlGraphicEngine(GraphicEngine):
 	display_map = {}
+	# only redraw and update the screen areas which changed since the
+	# previous frame (needs a display without DOUBLEBUF)
+	dirty_rendering = False
+	# above this number of dirty areas the whole screen is redrawn
+	max_dirty_rects = 64
 
-	def __init__(self, resolution, flags):
+	def __init__(self, resolution, flags=None):
 		GraphicEngine.__init__(self)
+		if flags is None and self.dirty_rendering:
+			flags = 0
+		elif flags is None:
+			flags = pygame.constants.DOUBLEBUF | \
+				pygame.constants.HWSURFACE | \
+				pygame.constants.HWACCEL # | pygame.FULLSCREEN
 		pygame.init()
 		pygame.font.init()
 		self._screen = pygame.display.set_mode(resolution, flags)
@@ -95,10 +156,26 @@ class SdlGraphicEngine(GraphicEngine):
 		self._font = pygame.font.Font(None, 40)
 		# for examples TODO: find a better way
 		self._img_path = '../data/pix'
+		self._alpha_color = (0xff, 0, 0xff)
+		self._draw_list = []
+		self._previous_draw_list = None
+		self._invalid_rects = []
+
+	def _blit(self, surface, pos):
+		if self.dirty_rendering:
+			rect = pygame.Rect((int(pos[0]), int(pos[1])),
+							surface.get_size())
+			self._draw_list.append((surface, rect))
+		else:	self._screen.blit(surface, pos)
 
 	def display_sprite(self, screen, sprite):
 		res = GraphicEngine.display_sprite(self, screen, sprite)
-		self._screen.blit(*res)
+		if res is None: return
+		raw_img, dst_pos, src_rect = res
+		self._blit(raw_img, dst_pos)
+
+	def draw_image(self, screen, raw_image, location, center=(0, 0)):
+		self._blit(raw_image, screen.get_ref() + location - center)
 
 	def display_dialog(self, screen, dialog):
 		# FIXME
@@ -113,13 +190,67 @@ class SdlGraphicEngine(GraphicEngine):
 		true_fps = self._clock.get_fps()
 		text = self._font.render(str(true_fps), True,
 			fps.fg_color, fps.bg_color)
-		self._screen.blit(text, fps.get_location())
+		self._blit(text, fps.get_location())
 
 	def flip(self):
+		if not self.dirty_rendering:
+			pygame.display.flip()
+			return
+		draw_list = self._draw_list
+		previous_draw_list = self._previous_draw_list
+		self._previous_draw_list = draw_list
+		self._draw_list = []
+		if previous_draw_list is None:
+			self._redraw_all(draw_list)
+			return
+		# a blit which appears, disappears or changes its place in the
+		# drawing order damages its area
+		items = set((i, id(surface), tuple(rect)) \
+				for i, (surface, rect) in enumerate(draw_list))
+		previous_items = set((i, id(surface), tuple(rect)) for i, \
+			(surface, rect) in enumerate(previous_draw_list))
+		dirty_rects = [pygame.Rect(rect) for i, surface_id, rect in \
+					items.symmetric_difference(previous_items)]
+		dirty_rects.extend(self._invalid_rects)
+		self._invalid_rects = []
+		if len(dirty_rects) == 0: return
+		if len(dirty_rects) > self.max_dirty_rects:
+			self._redraw_all(draw_list)
+			return
+		screen = self._screen
+		for dirty_rect in dirty_rects:
+			screen.set_clip(dirty_rect)
+			screen.fill((0, 0, 0))
+			for surface, rect in draw_list:
+				if rect.colliderect(dirty_rect):
+					screen.blit(surface, rect)
+		screen.set_clip(None)
+		pygame.display.update(dirty_rects)
+
+	def invalidate(self, rect=None):
+		'''
+    With dirty_rendering, force the next flip to redraw the given screen
+    area, e.g. when a displayed surface is changed in place.
+
+    rect: (x, y, w, h) in screen pixels. Default: the whole screen.
+		'''
+		if rect is None:
+			self._previous_draw_list = None
+			self._invalid_rects = []
+		elif self._previous_draw_list is not None:
+			self._invalid_rects.append(pygame.Rect(rect))
+
+	def _redraw_all(self, draw_list):
+		self._invalid_rects = []
+		self._screen.fill((0, 0, 0))
+		for surface, rect in draw_list:
+			self._screen.blit(surface, rect)
 		pygame.display.flip()
 
 	def clean(self):
-		self._screen.fill((0, 0, 0))
+		if self.dirty_rendering:
+			self._draw_list = []
+		else:	self._screen.fill((0, 0, 0))
 
 	def get_uniform_surface(self, shift=(0, 0), size=None,
 				color=(0, 0, 0), alpha=128):
@@ -131,14 +262,39 @@ class SdlGraphicEngine(GraphicEngine):
 		surface.set_alpha(alpha)
 		return SdlImageProxy(surface)
 
-	def load_image(self, filename):
+	def _get_image_load_options(self):
+		return (self._img_path, self._alpha_color)
+
+	def _decode_image(self, filename):
 		surface = pygame.image.load(os.path.join(self._img_path,
 							filename))
-		alpha_color = (0xff, 0, 0xff)
 		flags = pygame.constants.SRCCOLORKEY | pygame.constants.RLEACCEL
-		surface.set_colorkey(alpha_color, flags)
+		surface.set_colorkey(self._alpha_color, flags)
+		return surface
+
+	def _make_image_proxy(self, surface):
 		return SdlImageProxy(surface)
 
+	def _create_atlas_sheet(self, width, height):
+		# transparent sheet: colorkey and alpha of images are kept
+		sheet = pygame.Surface((width, height),
+					pygame.constants.SRCALPHA, 32)
+		sheet.fill((0, 0, 0, 0))
+		# same blitter as the standalone images
+		sheet.set_colorkey(self._alpha_color,
+					pygame.constants.SRCCOLORKEY)
+		return sheet
+
+	def _add_to_atlas_sheet(self, sheet, surface, x, y):
+		# max with a transparent area: plain copy of the pixels
+		sheet.blit(surface, (x, y),
+			special_flags=pygame.constants.BLEND_RGBA_MAX)
+		return sheet.subsurface((x, y) + surface.get_size())
+
+	def _get_image_nbytes(self, surface):
+		return surface.get_bytesize() * surface.get_width() * \
+						surface.get_height()
+
 	def load_text(self, text, font='Times New Roman',
 				font_size=20, x=0, y=0):
 		return None #FIXME
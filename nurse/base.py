@@ -1,4 +1,4 @@
-from events import SignalEvent
+from events import SignalEvent, SignalFanOutEvent
 
 ''' A low-level class for signal transmission between objects.
 .. module:: base
@@ -15,6 +15,10 @@ class Object(object):
 		self.name = name
 		self._sync_connections = {'__all__' : []}		
 		self._async_connections = {'__all__' : []}		
+		# dispatch tables: signal -> tuple of (receiver, slot), built
+		# lazily by emit and invalidated by connect/disconnect
+		self._sync_dispatch = {}
+		self._async_dispatch = {}
 
 	def set_property(self, name, value):
 		'''
@@ -66,6 +70,7 @@ class Object(object):
 			connections = self._async_connections
 		else:	connections = self._sync_connections
 		connections.setdefault(signal, []).append(connection)
+		self._invalidate_dispatch(signal, asynchronous)
 
 	def disconnect(self, signal, receiver, slot="receive_events",
 						asynchronous=True):
@@ -86,6 +91,41 @@ class Object(object):
                         connections = self._async_connections
                 else:   connections = self._sync_connections
                 connections[signal].remove(connection)
+                self._invalidate_dispatch(signal, asynchronous)
+
+	def _invalidate_dispatch(self, signal, asynchronous):
+		'''
+    Drop the cached receivers of the given signal. A change on '__all__'
+    impacts every signal, hence the whole table is dropped.
+		'''
+		if asynchronous:
+			dispatch = self._async_dispatch
+		else:	dispatch = self._sync_dispatch
+		if signal == '__all__':
+			dispatch.clear()
+		else:	dispatch.pop(signal, None)
+
+	def _get_receivers(self, signal, asynchronous):
+		'''
+    Return the immutable tuple of (receiver, slot) connected to signal
+    (including '__all__' connections). The tuple is computed once and
+    kept until the next connect/disconnect on this signal.
+		'''
+		if asynchronous:
+			dispatch = self._async_dispatch
+			connections = self._async_connections
+		else:
+			dispatch = self._sync_dispatch
+			connections = self._sync_connections
+		try:
+			return dispatch[signal]
+		except KeyError:
+			pass
+		receivers = tuple(connections['__all__'])
+		if signal != '__all__':
+			receivers = tuple(connections.get(signal, ())) + receivers
+		dispatch[signal] = receivers
+		return receivers
 
 	def emit(self, signal, signal_data=None):
 		'''
@@ -104,16 +144,8 @@ class Object(object):
 
 		'''
 
-		try:
-			async_connections = self._async_connections[signal]
-		except KeyError:
-			async_connections = []
-		async_connections += self._async_connections['__all__']
-		try:
-			sync_connections = self._sync_connections[signal]
-		except KeyError:
-			sync_connections = []
-		sync_connections += self._sync_connections['__all__']
+		sync_connections = self._get_receivers(signal, False)
+		async_connections = self._get_receivers(signal, True)
 
 		# batch active slots :
 		#   done in 2 passes to avoid domino effect if some observers
@@ -122,21 +154,19 @@ class Object(object):
 		connections = [(receiver, slot) \
 			for (receiver, slot) in sync_connections
 			if receiver.is_receiving_events()]
-		for (receiver, slot) in connections:
-			event = SignalEvent(self, receiver, slot,
-						signal, signal_data)
-			event.start()
+		if connections:
+			SignalFanOutEvent(self, connections,
+					signal, signal_data).start()
 
+		if not async_connections: return
 		connections = [(receiver, slot) \
 			for (receiver, slot) in async_connections
 			if receiver.is_receiving_events()]
+		if not connections: return
 
 		from config import Config # FIXME : move somewhere else
-		event_loop = Config.get_event_loop()
-		for (receiver, slot) in connections:
-			event = SignalEvent(self, receiver, slot,
-						signal, signal_data)
-			event_loop.add_event(event)
+		event = SignalFanOutEvent(self, connections, signal, signal_data)
+		Config.get_event_loop().add_event(event)
 
 	def call_slot(self, slot, event):
 		'''
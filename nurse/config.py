@@ -1,38 +1,50 @@
-#FIXME : must delayed imports
-import nurse.backends.sdl_backend
-import nurse.backends.pyglet_backend
-from nurse.backends.sdl_backend import SdlGraphicEngine, SdlEventLoop, \
-						SdlKeyBoardDevice
-from nurse.backends.pyglet_backend import PygletGraphicEngine, PygletEventLoop, \
-						PygletKeyBoardDevice
-
-import pygame # FIXME: remove
-
+import sys
 
 
 class Config(object):
 	# config data values
-	backend = 'sdl'
+	backend = 'sdl' # 'sdl', 'pyglet' or 'null' (headless)
 	resolution = 800, 600
 	caption = 'nurse game engine'
-	sdl_flags = pygame.constants.DOUBLEBUF | pygame.constants.HWSURFACE | \
-				pygame.constants.HWACCEL # | pygame.FULLSCREEN  
+	sdl_flags = None # None: DOUBLEBUF | HWSURFACE | HWACCEL
 	fps = 60
 
 	# internal data
 	default_context = None
-	graphic_backend_map = {\
-		'sdl' : (SdlGraphicEngine, (resolution, sdl_flags)),
-		'pyglet' : (PygletGraphicEngine, (resolution, caption))}
-	event_loop_backend_map = {'sdl' : SdlEventLoop,
-				'pyglet' : PygletEventLoop}
-	keyboard_backend_map = {'sdl' : SdlKeyBoardDevice,
-				'pyglet' : PygletKeyBoardDevice}
+	# backend name -> (module, graphic engine, event loop, keyboard device,
+	#		   Config attributes passed to the graphic engine)
+	# modules are only imported when the backend is instanciated
+	backend_registry = {\
+		'sdl' : ('nurse.backends.sdl_backend', 'SdlGraphicEngine',
+			'SdlEventLoop', 'SdlKeyBoardDevice',
+			('resolution', 'sdl_flags')),
+		'pyglet' : ('nurse.backends.pyglet_backend',
+			'PygletGraphicEngine', 'PygletEventLoop',
+			'PygletKeyBoardDevice', ('resolution', 'caption')),
+		'null' : ('nurse.backends.null_backend', 'NullGraphicEngine',
+			'NullEventLoop', 'NullKeyBoardDevice', ('resolution',))}
 	graphic_backend_instance =  None
 	event_loop_backend_instance = None
 	keyboard_backend_instance = None
 	# FIXME : add devices (keyboard, mouse) backend
 
+	@classmethod
+	def register_backend(cls, name, module, graphic_engine, event_loop,
+				keyboard_device, graphic_engine_args=('resolution',)):
+		'''
+    Register a backend under the given name (see backend_registry).
+    Classes are given by name and resolved from module on first use.
+		'''
+		cls.backend_registry[name] = (module, graphic_engine,
+			event_loop, keyboard_device, graphic_engine_args)
+
+	@classmethod
+	def _get_backend_class(cls, index):
+		infos = cls.backend_registry[cls.backend]
+		module_name = infos[0]
+		__import__(module_name)
+		return getattr(sys.modules[module_name], infos[index])
+
 	@classmethod
 	def init(cls):
 		# to avoid an import loop
@@ -55,14 +67,16 @@ class Config(object):
 	@classmethod
 	def get_graphic_engine(cls):
 		if cls.graphic_backend_instance is None:
-			c, args = cls.graphic_backend_map[cls.backend]
+			c = cls._get_backend_class(1)
+			args = [getattr(cls, name) for name in \
+				cls.backend_registry[cls.backend][4]]
 			cls.graphic_backend_instance = c(*args)
 		return cls.graphic_backend_instance
 
 	@classmethod
 	def get_event_loop(cls):
 		if cls.event_loop_backend_instance is None:
-			c = cls.event_loop_backend_map[cls.backend]
+			c = cls._get_backend_class(2)
 			cls.event_loop_backend_instance = c(Config.fps)
 			if cls.backend == 'pyglet':
 				gfx = cls.get_graphic_engine()
@@ -74,7 +88,7 @@ class Config(object):
 	@classmethod
 	def get_keyboard_device(cls):
 		if cls.keyboard_backend_instance is None:
-			c = cls.keyboard_backend_map[cls.backend]
+			c = cls._get_backend_class(3)
 			cls.keyboard_backend_instance = c()
 			if cls.backend == 'pyglet':
 				gfx = cls.get_graphic_engine()
@@ -1,38 +1,265 @@
+from collections import OrderedDict
+from itertools import groupby
+
 from state_machine import State, StateMachine
 from config import Config
+from spatial import UniformGrid
+
+
+class RenderList(object):
+	'''
+    Visible objects of a context sorted by layer (from background to
+    foreground), then by insertion order.
+
+    add returns a handle which removes the object in O(1). Sorted layers
+    and the flattened draw list are cached until the next change.
+
+    Objects with a true cullable attribute (see Sprite) are kept in a
+    spatial index, so that only the ones overlapping a view rectangle are
+    visited when a view is given to items or get_draw_list. The visible
+    objects of the last views are cached until the index changes.
+	'''
+	# number of views (or tuples of views) whose visible objects are cached
+	views_cache_max_entries = 16
+
+	def __init__(self, index=None):
+		'''
+    index: spatial index of cullable objects with a version attribute
+           incremented on each change (default: UniformGrid).
+		'''
+		self._layers = {} # layer -> OrderedDict(uid -> obj)
+		self._handles = {} # obj -> list of handles
+		self._uid = 0
+		self._items = None
+		self._draw_list = None
+		if index is None: index = UniformGrid(256.)
+		self._index = index
+		self._not_cullable = set() # objects not culled by request
+		self._uncullable_handles = None
+		self._visible_handles = {} # views -> sorted handles
+		self._visible_version = None # index version of _visible_handles
+
+	def _invalidate(self):
+		self._items = None
+		self._draw_list = None
+		self._uncullable_handles = None
+		self._visible_handles.clear()
+
+	def _is_cullable(self, obj):
+		return getattr(obj, 'cullable', False) and \
+			obj not in self._not_cullable
+
+	def add(self, obj, layer=0):
+		self._uid += 1
+		handle = (layer, self._uid)
+		self._layers.setdefault(layer, OrderedDict())[self._uid] = obj
+		self._handles.setdefault(obj, []).append(handle)
+		if self._is_cullable(obj): self._index.add(obj)
+		self._invalidate()
+		return handle
+
+	def remove(self, handle):
+		layer, uid = handle
+		objects = self._layers[layer]
+		obj = objects.pop(uid)
+		if not objects: del self._layers[layer]
+		handles = self._handles[obj]
+		handles.remove(handle)
+		if not handles:
+			del self._handles[obj]
+			if obj in self._index: self._index.remove(obj)
+			self._not_cullable.discard(obj)
+		self._invalidate()
+
+	def set_cullable(self, obj, cullable):
+		'''
+    Allow or forbid culling of obj. Objects whose bounding box may change
+    without notification (see nurse.spatial.UniformGrid) must not be
+    culled.
+		'''
+		if cullable:
+			self._not_cullable.discard(obj)
+		else:	self._not_cullable.add(obj)
+		index = self._index
+		if self._is_cullable(obj) and obj in self._handles:
+			index.add(obj)
+		elif obj in index: index.remove(obj)
+		self._invalidate()
+
+	def get_handles(self, obj, layer=None):
+		'''
+    Return the handles of obj (in the given layer if not None).
+		'''
+		handles = self._handles.get(obj, [])
+		if layer is None: return list(handles)
+		return [handle for handle in handles if handle[0] == layer]
+
+	def _get_visible_handles(self, views):
+		'''
+    Return the sorted handles of objects which are not culled by at least
+    one of the views. The result is cached until the next change of the
+    objects or of the index.
+		'''
+		cache = self._visible_handles
+		if self._visible_version != self._index.version:
+			cache.clear()
+			self._visible_version = self._index.version
+		try:
+			return cache[views]
+		except KeyError:
+			pass
+		if self._uncullable_handles is None:
+			index = self._index
+			self._uncullable_handles = [handle for obj, handles \
+				in self._handles.iteritems() if obj not in index \
+				for handle in handles]
+		handles = list(self._uncullable_handles)
+		if len(views) == 1:
+			visible = self._index.query(views[0])
+		else:
+			visible = set()
+			for view in views: visible.update(self._index.query(view))
+		for obj in visible:
+			handles.extend(self._handles[obj])
+		handles.sort() # by layer, then insertion order
+		if len(cache) >= self.views_cache_max_entries: cache.clear()
+		cache[views] = handles
+		return handles
+
+	def items(self, view=None):
+		'''
+    Return the sorted list of (layer, objects).
+
+    view: world rectangle (x, y, w, h). If given, cullable objects which do
+          not overlap it are left out.
+		'''
+		if view is not None: return self.items_in_views((view,))
+		if self._items is None:
+			self._items = [(layer, tuple(self._layers[layer].values())) \
+					for layer in sorted(self._layers)]
+		return self._items
+
+	def items_in_views(self, views):
+		'''
+    Return the sorted list of (layer, objects) seen by at least one of the
+    views, see items.
+		'''
+		layers = self._layers
+		return [(layer, tuple(layers[layer][uid] for l, uid in handles)) \
+			for layer, handles in groupby(
+			self._get_visible_handles(views), lambda handle: handle[0])]
+
+	def keys(self):
+		return [layer for layer, objects in self.items()]
+
+	def __getitem__(self, layer):
+		for l, objects in self.items():
+			if l == layer: return objects
+		raise KeyError(layer)
+
+	def __len__(self):
+		return len(self._layers)
+
+	def get_draw_list(self, view=None):
+		'''
+    Return the tuple of all the objects in drawing order.
+
+    view: world rectangle (x, y, w, h), see items.
+		'''
+		if view is not None:
+			layers = self._layers
+			return tuple(layers[layer][uid] for layer, uid \
+					in self._get_visible_handles((view,)))
+		if self._draw_list is None:
+			self._draw_list = tuple(obj for layer, objects in \
+					self.items() for obj in objects)
+		return self._draw_list
+
 
 class Context(State):
 	def __init__(self, name, is_visible=True, is_active=True,
 					_is_receiving_events=True):
 		State.__init__(self, name)
-		self._visible_data = {}
+		self._visible_data = RenderList()
 		self._screens = []
 		self._fsm_list = []
+		# update scheduling: only ticked machines are updated, woken
+		# ones are checked (see StateMachine.needs_update) first
+		self._fsm_rank = {} # fsm -> rank of registration
+		self._next_rank = 0
+		self._ticked = set()
+		self._woken = set()
+		self._update_list = None
 		self.is_visible = is_visible
 		self.is_active = is_active
 		self._is_receiving_events = _is_receiving_events
 
 	def add_fsm(self, fsm):
 		self._fsm_list.append(fsm)
+		self._fsm_rank[fsm] = self._next_rank
+		self._next_rank += 1
+		self.wake_fsm(fsm)
 
 	def remove_fsm(self, fsm):
 		self._fsm_list.remove(fsm)
+		del self._fsm_rank[fsm]
+		self.sleep_fsm(fsm)
+
+	def wake_fsm(self, fsm):
+		self._woken.add(fsm)
+
+	def sleep_fsm(self, fsm):
+		self._woken.discard(fsm)
+		if fsm in self._ticked:
+			self._ticked.remove(fsm)
+			self._update_list = None
+
+	def get_ticked_fsms(self):
+		'''
+    Return the list of machines updated on each tick, in registration
+    order.
+		'''
+		if self._woken:
+			woken, self._woken = self._woken, set()
+			for fsm in woken:
+				if fsm.needs_update():
+					self._ticked.add(fsm)
+				else:	self._ticked.discard(fsm)
+			self._update_list = None
+		if self._update_list is None:
+			self._update_list = sorted(self._ticked,
+					key=self._fsm_rank.__getitem__)
+		return self._update_list
 
 	def add_visible_data(self, data, layer=0):
-		self._visible_data.setdefault(layer, []).append(data)
+		return self._visible_data.add(data, layer)
 
 	def get_visible_data(self):
 		return self._visible_data
 
+	def remove_sprite(self, sprite):
+		'''
+    Remove sprite from the context: it is neither displayed nor updated
+    anymore and its images are released.
+		'''
+		data = self._visible_data
+		for handle in data.get_handles(sprite): data.remove(handle)
+		if sprite in self._fsm_rank: self.remove_fsm(sprite)
+		sprite.release_images()
+
 	def add_screen(self, screen):
 		self._screens.append(screen)
 
-	def display(self):
-		for screen in self._screens:
-			screen.display_context(self)
+	def display(self, time=None):
+		'''
+    time: frame time (in ms), see GraphicEngine.display_context.
+		'''
+		# one render pass shared by all the screens
+		Config.get_graphic_engine().display_screens(self._screens,
+								self, time)
 
 	def update(self, dt):
-		for fsm in self._fsm_list:
+		for fsm in self.get_ticked_fsms():
 			fsm.update(dt)
 
 	def delegate(self, event):
@@ -41,27 +268,20 @@ class Context(State):
 	def is_receiving_events(self):
 		return self._is_receiving_events
 
-        def set_visible(self, sprite, is_visible, layer=None):
-               '''
+	def set_visible(self, sprite, is_visible, layer=None):
+		'''
     set sprite visible or invisible in its parent context
-               '''
-               if is_visible == False:
-                       layers_detected = []    # contains the layers in which the sprite name is found
-                       if layer is None:
-                               layers = self.get_visible_data().keys()
-                               for l in layers:
-                                       for obj in self.get_visible_data()[l] :
-                                               if obj == sprite :
-                                                       layers_detected.append(l)
-		       layer = layers_detected[0]
-					
-                       if len(layers_detected) > 1:
-                              raise Exception('Different sprites match name \'%s\', must specify layer'\
-                                      %sprite.name )
-						
-                       self.get_visible_data()[layer].remove(obj)
-               else :
-                       self.add_visible_data(sprite, sprite._layer)
+		'''
+		data = self._visible_data
+		if is_visible == False:
+			handles = data.get_handles(sprite, layer)
+			if len(handles) > 1:
+				raise Exception('Different sprites match name ' \
+					'\'%s\', must specify layer' % sprite.name)
+			for handle in handles: data.remove(handle)
+		elif not data.get_handles(sprite, sprite._layer):
+			self.add_visible_data(sprite, sprite._layer)
+
 
 class ContextManager(StateMachine):
 	def __init__(self):
@@ -71,11 +291,14 @@ class ContextManager(StateMachine):
 						asynchronous=False)
 
 	def display(self):
-		Config.get_graphic_engine().clean()
+		gfx = Config.get_graphic_engine()
+		# frame time sampled once for all contexts and screens
+		time = gfx.get_ticks()
+		gfx.clean()
 		for context in self._possible_states.values():
 			if context.is_visible:
-				context.display()
-		Config.get_graphic_engine().flip()
+				context.display(time)
+		gfx.flip()
 
 	def update(self, dt):
 		for context in self._possible_states.values():
@@ -1,9 +1,11 @@
-
-
-class Event(object): pass
+class Event(object):
+	__slots__ = ()
 
 
 class SignalEvent(Event):
+	__slots__ = ('type', 'sender', 'receiver', 'slot',
+			'signal', 'signal_data')
+
 	def __init__(self, sender, receiver, slot, signal, signal_data=None):
 		self.type = 'signal'
 		self.sender = sender
@@ -14,3 +16,46 @@ class SignalEvent(Event):
 
 	def start(self):
 		self.receiver.call_slot(self.slot, self)
+
+
+class SignalFanOutEvent(SignalEvent):
+	'''
+    A single event shared by every receiver of one emit call.
+
+    The (receiver, slot) tuple is carried once; receiver and slot attributes
+    are updated before each slot call, so a slot must not keep a reference
+    on the event to read them later.
+	'''
+	__slots__ = ('connections',)
+
+	def __init__(self, sender, connections, signal, signal_data=None):
+		SignalEvent.__init__(self, sender, None, None,
+					signal, signal_data)
+		self.connections = connections
+
+	def start(self):
+		for (receiver, slot) in self.connections:
+			self.receiver = receiver
+			self.slot = slot
+			receiver.call_slot(slot, self)
+
+
+class TransitionEvent(Event):
+	'''
+    Asynchronous transition of a state machine, from the state which was
+    current when the signal was emitted. It is dropped if the machine left
+    that state in the meantime.
+	'''
+	__slots__ = ('type', 'fsm', 'src', 'dst', 'src_prop', 'dst_prop')
+
+	def __init__(self, fsm, src, dst, src_prop={}, dst_prop={}):
+		self.type = 'transition'
+		self.fsm = fsm
+		self.src = src
+		self.dst = dst
+		self.src_prop = src_prop
+		self.dst_prop = dst_prop
+
+	def start(self):
+		self.fsm.change_state(self.src, self.dst, self.src_prop,
+							self.dst_prop)
@@ -9,24 +9,30 @@ import numpy as np
 class DialogState(State):
 	
 	def _parse_lines(self):
-		import string
-		words = string.split(self._text, ' ')
-		current_text = words[0]
-		lines = [ current_text ]	
-		
-		for word in words[1:] :
-			current_text = string.join([current_text, word], ' ')
-			repr = Config.get_graphic_engine().load_text(\
-				current_text, self.font, self.font_size,
-				0,0)
-			if repr.content_width > self.max_width:
-				current_text = word
+		'''
+    Word wrap the text in max_width. Each distinct word is measured once
+    (see GraphicEngine.get_text_width) and line widths are summed, so that
+    wrapping is linear in the text length.
+		'''
+		gfx = Config.get_graphic_engine()
+		def width(text):
+			return gfx.get_text_width(text, self.font, self.font_size)
+		# a lone space may not be measured by every backend. Kerning is
+		# ignored: a line may be a few pixels wider than measured
+		space_width = width('x x') - 2 * width('x')
+		words = self._text.split(' ')
+		lines = [words[0]]
+		line_width = width(words[0])
+		for word in words[1:]:
+			word_width = width(word)
+			if line_width + space_width + word_width > self.max_width:
 				lines.append(word)
+				line_width = word_width
 			else:
-				lines[-1] = current_text
+				lines[-1] += ' ' + word
+				line_width += space_width + word_width
 		return lines
-			
-	
+		
 	def __init__(self, name='text', text='...', font='Times New Roman',
 			font_size=20, text_area=None, perso=None, char_per_sec=5.,
 			typing_machine_mode=True):
@@ -43,12 +49,14 @@ class DialogState(State):
 		else:	self.char_delay = 0
 		self.typing_machine_mode = typing_machine_mode
 		self.list_backend_repr = []
-		self._current_time = 0
+		self._timer = None # types a char every char_delay ms
 		self._current_indice = 0
 		self._current_text = ''
 		self._current_line = 0
 		self._current_height = 0
 		self._has_terminated = False
+		self.connect('type_char', self, 'on_type_char',
+						asynchronous=False)
 	
 	def _update_chars(self, n):
 		max_ind = len(self._lines[self._current_line])
@@ -60,36 +68,52 @@ class DialogState(State):
 					self.emit('dialog_state_terminated')
 				return
 			ind = 0
-			self._current_text = ''
 			self._current_line += 1
 			self._current_height += (self._current_line % self.max_lines) * self.list_backend_repr[-1].content_height
-
+			max_ind = len(self._lines[self._current_line])
+		line = self._lines[self._current_line]
+		if ind == 0:
+			# the whole line is laid out once, then revealed
+			anchor_x, anchor_y = self._fsm.get_location()
+			repr = Config.get_graphic_engine().load_typing_text(\
+					line, self.font, self.font_size,
+					anchor_x, anchor_y + self._current_height)
+			self.list_backend_repr.append(repr)
 		new_ind = ind + n
 		if new_ind > max_ind: new_ind = max_ind
-		new_text = self._lines[self._current_line][ind:new_ind]
-		self._current_text += new_text
+		self.list_backend_repr[-1].reveal(new_ind)
+		self._current_text = line[:new_ind]
 		self._current_indice = new_ind
-		anchor_x, anchor_y = self._fsm.get_location()
-		repr = Config.get_graphic_engine().load_text(\
-				self._current_text, self.font, self.font_size,
-				anchor_x, anchor_y + self._current_height)
-		if len(self.list_backend_repr) == 0:
-			self.list_backend_repr.append(repr)
-		else:	self.list_backend_repr[-1] = repr
-		if len(self._current_text) == len(self._lines[self._current_line]):
-			self.list_backend_repr.append(repr)
 				
 	def update(self, dt):
-		self._current_time += dt	
-		if self._current_time >= self.char_delay:
-			if self.char_delay == 0:
-				n = len(self._text)
-			else:	n = int(self._current_time / self.char_delay)
-			self._update_chars(n)
-			self._current_time -= n * self.char_delay
+		# chars are typed by self._timer, without delay a whole line
+		# is shown per update
+		if self.char_delay == 0:
+			self._stop_typing()
+			self._update_chars(len(self._text))
+
+	def _stop_typing(self):
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
 
 	def on_entered(self):
 		self.emit('dialog_state_started')
+		if self.char_delay > 0 and not self._has_terminated:
+			timers = Config.get_event_loop().timers
+			self._timer = timers.add_timer(self.char_delay, self,
+				'type_char', period=self.char_delay)
+
+	def on_exited(self):
+		self._stop_typing()
+		State.on_exited(self)
+
+	def on_type_char(self, event):
+		# typing is paused with the context of the dialog
+		context = self._fsm.get_context()
+		if context is not None and not context.is_active: return
+		self._update_chars(1)
+		if self._has_terminated: self._stop_typing()
 
 class DialogListener(Object):
 	def __init__(self):
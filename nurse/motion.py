@@ -50,6 +50,14 @@ class Motion(StateMachine):
 		'''
 		raise NotImplementedError
 
+	def is_idle(self):
+		'''
+    Return True if update_sprite does not move sprites in the current
+    state. Idle sprites are not updated (see Sprite.needs_update): the
+    motion must emit "state_changed" when it stops being idle.
+		'''
+		return False
+
 	def init(self, sprite):
 		'''
     Initialize location of a sprite according to this motion.
@@ -98,6 +106,9 @@ class NoMotion(Motion):
 		'''
 		pass
 
+	def is_idle(self):
+		return True
+
 no_motion = NoMotion()
 
 
@@ -229,6 +240,129 @@ class PathMotion(Motion):
 		sprite.set_location(new_loc)
 
 
+class BatchPathMotion(StateMachine):
+	'''
+    Drive many sprites along closed paths (like PathMotion with the
+    Start_to_End way) with a few vectorized operations per frame.
+
+    Paths are stored as padded arrays with their cumulative arc length: the
+    location of each sprite is found from its covered distance with a
+    single searchsorted call. No "state_changed" is emitted at checkpoints,
+    the current segment of each sprite is available in self.segments.
+
+    If a SpriteStore is given, all the sprites must be stored in it and
+    their locations are written directly in the store arrays. Like
+    SpriteStore.update, moving sprites then emit "location_changed" only if
+    the store emit_location_changed is True (otherwise they are not
+    culled). Without store, set_location is called on each sprite.
+	'''
+	def __init__(self, name='batch_path_motion', context=None, store=None):
+		StateMachine.__init__(self, name, context)
+		self._store = store
+		self._sprites = []
+		self._paths = []
+		self._speeds = np.zeros(0)
+		self._distances = np.zeros(0)
+		# (speed, distance) of sprites added since the last compilation
+		self._pending = []
+		self._compiled = False
+		self.segments = np.zeros(0, dtype=int)
+
+	def add_sprite(self, sprite, path, speed=100., distance=0.):
+		'''
+    Parameters:
+
+    sprite : Sprite instance
+    path : list of 2-elements tuples or arrays
+        list of coordinates expressed in world-coordinate metric.
+    speed : float
+        Speed in world-coordinate metric per seconds.
+    distance : float
+        Initial distance covered from the first checkpoint.
+		'''
+		path = np.asarray(path, dtype=float)
+		if len(path) < 2: raise ValueError('path needs 2 checkpoints')
+		self._sprites.append(sprite)
+		self._paths.append(np.vstack((path, path[:1])))
+		self._pending.append((speed, distance))
+		self._compiled = False
+
+	def _compile(self):
+		'''
+    Build the padded (N, K + 1) arrays of checkpoints, cumulative arc
+    lengths and (N, K) segment directions.
+		'''
+		n = len(self._paths)
+		k = max(len(path) for path in self._paths) - 1
+		points = np.zeros((n, k + 1, 2))
+		lengths = np.zeros((n, k))
+		for i, path in enumerate(self._paths):
+			m = len(path)
+			points[i, :m] = path
+			points[i, m:] = path[-1]
+			lengths[i, :m - 1] = np.sqrt(((path[1:] - \
+						path[:-1]) ** 2).sum(axis=1))
+		cumul = np.zeros((n, k + 1))
+		cumul[:, 1:] = np.cumsum(lengths, axis=1)
+		self._points = points
+		self._cumul = cumul
+		self._totals = cumul[:, -1].copy()
+		with np.errstate(invalid='ignore', divide='ignore'):
+			directions = (points[:, 1:] - points[:, :-1]) / \
+							lengths[:, :, np.newaxis]
+		directions[lengths == 0] = 0
+		self._directions = directions
+		# rows shifted by increasing offsets give one sorted array
+		self._offsets = np.arange(n) * (self._totals.max() + 1.)
+		self._flat_cumul = (cumul + self._offsets[:, np.newaxis]).ravel()
+		if self._pending:
+			speeds, distances = zip(*self._pending)
+			self._speeds = np.concatenate((self._speeds, speeds))
+			self._distances = np.concatenate((self._distances,
+								distances))
+			self._pending = []
+		self._compiled = True
+
+	def get_locations(self):
+		'''
+    Return the (N, 2) array of current locations of the sprites.
+		'''
+		if not self._compiled: self._compile()
+		n, k = self._directions.shape[:2]
+		totals = self._totals
+		distances = np.where(totals > 0,
+			np.mod(self._distances, np.where(totals > 0, totals, 1)), 0)
+		ids = np.searchsorted(self._flat_cumul, distances + self._offsets,
+							side='right') - 1
+		rows = np.arange(n)
+		segments = np.clip(ids - rows * (k + 1), 0, k - 1)
+		self.segments = segments
+		remaining = distances - self._cumul[rows, segments]
+		return self._points[rows, segments] + \
+			self._directions[rows, segments] * remaining[:, np.newaxis]
+
+	def update(self, dt):
+		'''
+    dt : float
+        delta of time (in ms) since the last call.
+		'''
+		if not self._sprites: return
+		if not self._compiled: self._compile()
+		self._distances += self._speeds * (dt / 1000.)
+		locations = self.get_locations()
+		if self._store is not None:
+			rows = [sprite._store_row for sprite in self._sprites]
+			self._store.location[rows] = locations
+			if not self._store.emit_location_changed: return
+			# spatial indexes follow the moving sprites
+			for i in np.flatnonzero(self._speeds):
+				sprite = self._sprites[i]
+				sprite.emit("location_changed", sprite._location)
+		else:
+			for sprite, location in zip(self._sprites, locations):
+				sprite.set_location(location)
+
+
 class KeyboardMotion(Motion):
 	'''
     Abstract class used by keyboard-based motions.
@@ -242,6 +376,10 @@ class KeyboardMotion(Motion):
 		Motion.set_context(self, context)
 		self._register_transitions(context)
 
+	def is_idle(self):
+		return self._current_state is None or \
+			self._current_state.name == 'rest'
+
 	def update_sprite(self, sprite, dt):
 		state_name = self._current_state.name
 		if state_name == 'rest': return
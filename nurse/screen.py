@@ -5,11 +5,14 @@ from config import Config
 
 
 class VirtualScreen(Object):
+	# extra border (in pixels) of the view rectangle used for culling
+	cull_margin = 0
+
 	def __init__(self, name, geometry=(0, 0, 320, 200)):
 		self.geometry = geometry
 
-	def display_context(self, context):
-		Config.get_graphic_engine().display_context(self, context)
+	def display_context(self, context, time=None):
+		Config.get_graphic_engine().display_context(self, context, time)
 
 	def get_ref(self):
 		'''
@@ -18,6 +21,17 @@ class VirtualScreen(Object):
 		'''
 		return self._ref_center
 
+	def get_view_rect(self):
+		'''
+    Return the rectangle (x, y, w, h) of the world seen by the virtual
+    screen, in world coordinates.
+		'''
+		x, y, width, height = self.geometry
+		ref = self.get_ref()
+		m = self.cull_margin
+		return (x - ref[0] - m, y - ref[1] - m,
+				width + 2 * m, height + 2 * m)
+
 
 class VirtualScreenWorldCoordinates(VirtualScreen):
 	def __init__(self, name='default_screen', geometry=(0, 0, 320, 200),
@@ -0,0 +1,175 @@
+import math
+
+import numpy as np
+
+from base import Object
+
+
+''' Spatial indexing of objects with a bounding box.
+.. module:: spatial
+'''
+
+
+def collide(bb1, bb2):
+	'''
+    Return True if the two axis-aligned bounding boxes (x, y, w, h) overlap
+    (touching borders are colliding).
+	'''
+	x1, y1, w1, h1 = bb1
+	x2, y2, w2, h2 = bb2
+	return x1 <= x2 + w2 and x2 <= x1 + w1 and \
+		y1 <= y2 + h2 and y2 <= y1 + h1
+
+
+class LocationTracker(Object):
+	'''
+    Call callback(obj) each time obj emits "location_changed" or
+    "bounding_box_changed".
+	'''
+	def __init__(self, callback, obj):
+		Object.__init__(self, 'location_tracker')
+		self._callback = callback
+		self._obj = obj
+
+	def on_location_changed(self, event):
+		self._callback(self._obj)
+
+	def on_bounding_box_changed(self, event):
+		self._callback(self._obj)
+
+
+def colliding_pairs(boxes):
+	'''
+    Find every pair of overlapping boxes with a vectorized sweep and prune
+    along the x axis.
+
+    Parameters:
+
+    boxes : (N, 4) array
+        bounding boxes (x, y, w, h).
+
+    Returns:
+
+    (M, 2) array of indices (i, j), i < j, of overlapping boxes.
+	'''
+	boxes = np.asarray(boxes, dtype=float)
+	n = len(boxes)
+	if n < 2: return np.zeros((0, 2), dtype=int)
+	x0 = boxes[:, 0]
+	order = np.argsort(x0, kind='mergesort')
+	sx0 = x0[order]
+	sx1 = sx0 + boxes[order, 2]
+	# candidates of the i-th sorted box: next boxes starting before its end
+	end = np.searchsorted(sx0, sx1, side='right')
+	counts = np.maximum(end - np.arange(n) - 1, 0)
+	total = counts.sum()
+	if total == 0: return np.zeros((0, 2), dtype=int)
+	i = np.repeat(np.arange(n), counts)
+	starts = np.cumsum(counts) - counts
+	j = i + 1 + np.arange(total) - np.repeat(starts, counts)
+	a, b = order[i], order[j]
+	y0 = boxes[:, 1]
+	y1 = y0 + boxes[:, 3]
+	mask = (y0[a] <= y1[b]) & (y0[b] <= y1[a])
+	pairs = np.column_stack((a[mask], b[mask]))
+	pairs.sort(axis=1)
+	return pairs
+
+
+class UniformGrid(object):
+	'''
+    Broad-phase spatial index: objects are stored in every cell of a uniform
+    grid covered by their bounding box.
+
+    Indexed objects must provide bounding_box() and emit
+    "location_changed" when they move and "bounding_box_changed" when their
+    size or center change (see Sprite). Other changes of the bounding box
+    must be notified with update().
+	'''
+	_tracked_signals = ("location_changed", "bounding_box_changed")
+
+	def __init__(self, cell_size=64.):
+		'''
+    cell_size : float
+        width and height of the cells in world coordinates.
+		'''
+		self._cell_size = float(cell_size)
+		self._cells = {}
+		self._entries = {} # obj -> [bb, cells, tracker]
+		# incremented on each change of the indexed boxes, so that query
+		# results can be cached by the callers
+		self.version = 0
+
+	def _get_cells(self, bb):
+		x, y, w, h = bb
+		s = self._cell_size
+		i0, i1 = int(math.floor(x / s)), int(math.floor((x + w) / s))
+		j0, j1 = int(math.floor(y / s)), int(math.floor((y + h) / s))
+		return tuple((i, j) for i in xrange(i0, i1 + 1) \
+					for j in xrange(j0, j1 + 1))
+
+	def __len__(self):
+		return len(self._entries)
+
+	def __contains__(self, obj):
+		return obj in self._entries
+
+	def add(self, obj):
+		if obj in self._entries: return
+		bb = tuple(obj.bounding_box())
+		cells = self._get_cells(bb)
+		for cell in cells:
+			self._cells.setdefault(cell, set()).add(obj)
+		tracker = LocationTracker(self.update, obj)
+		for signal in self._tracked_signals:
+			obj.connect(signal, tracker, "on_" + signal,
+						asynchronous=False)
+		self._entries[obj] = [bb, cells, tracker]
+		self.version += 1
+
+	def remove(self, obj):
+		bb, cells, tracker = self._entries.pop(obj)
+		for signal in self._tracked_signals:
+			obj.disconnect(signal, tracker, "on_" + signal,
+						asynchronous=False)
+		self._remove_from_cells(obj, cells)
+		self.version += 1
+
+	def _remove_from_cells(self, obj, cells):
+		for cell in cells:
+			objects = self._cells[cell]
+			objects.discard(obj)
+			if not objects: del self._cells[cell]
+
+	def update(self, obj):
+		'''
+    Update the index after a change of the bounding box of obj.
+		'''
+		entry = self._entries[obj]
+		bb = tuple(obj.bounding_box())
+		if bb == entry[0]: return
+		self.version += 1
+		cells = self._get_cells(bb)
+		if cells != entry[1]:
+			self._remove_from_cells(obj, entry[1])
+			for cell in cells:
+				self._cells.setdefault(cell, set()).add(obj)
+			entry[1] = cells
+		entry[0] = bb
+
+	def get_bounding_box(self, obj):
+		return self._entries[obj][0]
+
+	def query(self, bb):
+		'''
+    Return the list of indexed objects whose bounding box overlaps bb.
+		'''
+		cells = self._cells
+		candidates = set()
+		for cell in self._get_cells(bb):
+			try:
+				candidates.update(cells[cell])
+			except KeyError: pass
+		entries = self._entries
+		return [obj for obj in candidates \
+			if collide(bb, entries[obj][0])]
@@ -1,3 +1,5 @@
+import bisect
+
 import numpy as np
 
 from base import Object
@@ -5,6 +7,7 @@ from state_machine import StateMachine, State
 from config import Config
 from backends import KeyBoardDevice
 from motion import *
+from spatial import UniformGrid, collide, colliding_pairs, LocationTracker
 
 
 ''' This module groups standard sprites.
@@ -15,18 +18,24 @@ from motion import *
 
 #-------------------------------------------------------------------------------
 class Sprite(StateMachine):
+	# drawn inside its bounding box: may be skipped out of the screen views
+	cullable = True
+
 	def __init__(self, name='sprite', context=None, layer=1):
 		'''
     name:  name of the sprite
     layer: (default: 1 since 0 is reserved for background)
 		'''
 		StateMachine.__init__(self, name, context)
-		if context is None: context = Config.get_default_context()
-		context.add_visible_data(self, layer)
 		self._layer = layer
 		self._location = np.zeros(2)
 		self._size = np.zeros(2)
 		self._bb_center = np.zeros(2)
+		self._store = None # SpriteStore holding location, size, center
+		self._store_row = None
+		if context is None: context = Config.get_default_context()
+		# after the bounding box is defined: it may be indexed
+		context.add_visible_data(self, layer)
 		self.set_motion(no_motion)
 
 	def set_motion(self, motion, cont=False):
@@ -43,11 +52,21 @@ class Sprite(StateMachine):
 		'''
 		if motion.get_context() is None:
 			motion.set_context(self.get_context())
+		old_motion = getattr(self, '_motion', None)
+		if old_motion is not None and \
+				not isinstance(old_motion, NoMotion):
+			old_motion.disconnect("state_changed", self, "on_wake",
+							asynchronous=False)
 		self._motion = motion
+		# idle sprites sleep until their motion changes of state
+		if not isinstance(motion, NoMotion):
+			motion.connect("state_changed", self, "on_wake",
+							asynchronous=False)
 		motion.start()
 		if cont:
 			motion.cont(self)
 		else:	motion.init(self)
+		self.wake()
 
 	def get_motion(self):
 		'''
@@ -62,6 +81,11 @@ class Sprite(StateMachine):
 		'''
 		self._motion.update_sprite(self, dt)
 
+	def needs_update(self):
+		if type(self).update.im_func is not Sprite.update.im_func:
+			return True
+		return not self._motion.is_idle()
+
 	def bounding_box(self):
 		return (self._location[0] - self._bb_center[0], 
 			self._location[1] - self._bb_center[1], 
@@ -77,9 +101,85 @@ class Sprite(StateMachine):
 		'''
     set sprite location in world coordinate system
 		'''
-		self._location = location
+		if self._store is None:
+			self._location = location
+		else:	self._location[:] = location
 		self.emit("location_changed", location)
 
+	def _set_size(self, size):
+		if self._store is None:
+			self._size = np.array(size, dtype=float)
+		else:	self._size[:] = size
+		self.emit("bounding_box_changed")
+
+	def _set_bb_center(self, center):
+		if self._store is None:
+			self._bb_center = np.array(center, dtype=float)
+		else:	self._bb_center[:] = center
+		self.emit("bounding_box_changed")
+
+	def release_images(self):
+		'''
+    Give back to the graphic engine the images loaded by the sprite (see
+    GraphicEngine.release_image). The sprite must not be displayed
+    anymore.
+		'''
+		pass
+
+
+class AnimationClip(object):
+	'''
+    Compiled animation: frames, per-frame durations and center offsets
+    stored in contiguous arrays. A clip can be shared by several sprites
+    (see AnimatedSprite.set_clip), except between pyglet sprites displayed
+    at the same time with batch rendering since their frames hold a
+    position.
+	'''
+	def __init__(self, frames, durations, centers):
+		'''
+    frames :    list of image proxies.
+    durations : list of positive frame durations in ms (or one duration
+                for all).
+    centers :   list of frame centers in pixels (or one center for all).
+		'''
+		n = len(frames)
+		self.frames = tuple(frames)
+		self.durations = np.resize(np.asarray(durations, dtype=float), n)
+		if (self.durations <= 0).any():
+			raise ValueError('frame durations must be positive')
+		self.centers = np.resize(np.asarray(centers, dtype=float), (n, 2))
+		self._ends = list(np.cumsum(self.durations))
+		if n == 0:
+			self.total = 0
+			self._delay = None
+		else:
+			self.total = self._ends[-1]
+			if (self.durations == self.durations[0]).all():
+				self._delay = self.durations[0]
+			else:	self._delay = None
+
+	def release(self):
+		'''
+    Release the frames loaded from the graphic engine cache.
+		'''
+		gfx = Config.get_graphic_engine()
+		for frame in self.frames: gfx.release_image(frame)
+		self.frames = ()
+
+	def __len__(self):
+		return len(self.frames)
+
+	def get_frame_infos(self, time):
+		'''
+    Return the frame and its center at the given time (in ms).
+		'''
+		if not self.frames: return None, None
+		t = time % self.total
+		if self._delay is not None:
+			id = min(int(t / self._delay), len(self.frames) - 1)
+		else:	id = bisect.bisect_right(self._ends, t)
+		return self.frames[id], self.centers[id]
+
 
 class AnimatedSprite(Sprite):
 	def __init__(self, name='animated_sprite', context=None, layer=1):
@@ -88,13 +188,39 @@ class AnimatedSprite(Sprite):
     layer: (default: 1 since 0 is reserved for background)
 		'''
 		Sprite.__init__(self, name, context, layer)
-		self._current_frame_id = 0
-		self._frames = {}
-		self._frames_center_location = {}
-		self._refresh_delay = {}
+		self._clips = {}
+		self._default_clip = None
+		# clips loaded by load_frames_from_filenames, released with
+		# the sprite or when replaced
+		self._owned_clips = set()
+
+	def set_clip(self, state, clip):
+		'''
+    Use the given AnimationClip for a state (see
+    load_frames_from_filenames for the state parameter).
+		'''
+		old_clip = self.get_clip(state)
+		if state == '__default__':
+			self._default_clip = clip
+		else:	self._clips[state] = clip
+		if old_clip in self._owned_clips and old_clip is not \
+			self._default_clip and old_clip not in \
+			self._clips.values():
+			self._owned_clips.remove(old_clip)
+			old_clip.release()
+
+	def release_images(self):
+		for clip in self._owned_clips: clip.release()
+		self._owned_clips.clear()
+		self._clips = {}
+		self._default_clip = None
+
+	def get_clip(self, state):
+		if state == '__default__': return self._default_clip
+		return self._clips.get(state)
 
 	def load_frames_from_filenames(self, state,
-		frames_fnames=[], center_location=(0,0), fps=30):
+		frames_fnames=[], center_location=(0,0), fps=30, durations=None):
 		'''
     Load frames from images (one image per file) for a given state
 
@@ -112,18 +238,17 @@ class AnimatedSprite(Sprite):
 		  or - 'centered_bottom': the center is centered on the bottom
 		       of the images.
     fps:             number of frames per seconds.
+    durations:       list of frame durations in ms (one per image).
+                     Overrides fps.
+
+    Return the AnimationClip of the state.
 		'''
-		self._frames[state] = [ \
-			Config.get_graphic_engine().load_image(fname) \
-			for fname in frames_fnames]
-		self._refresh_delay[state] = int(1000 / fps)
+		frames = [Config.get_graphic_engine().load_image(fname) \
+					for fname in frames_fnames]
+		if durations is None: durations = int(1000 / fps)
 		loc = []
-		for img in self._frames[state]:
-			width, height = img.get_size()
-			if width > self._size[0]: self._size[0] = width
-			if height > self._size[1]: self._size[1] = height
 		if isinstance(center_location, str):
-			for img in self._frames[state]:
+			for img in frames:
 				width, height = img.get_size()
 				if center_location == 'centered':
 					loc.append(np.array([width, height])/2.)
@@ -131,56 +256,66 @@ class AnimatedSprite(Sprite):
 					loc.append(np.array([width/2., height]))
 		elif isinstance(center_location, list):
 			loc = center_location
-		else:	loc = [center_location] * len(self._frames[state])
-		if center_location == 'centered':
-			self._bb_center = self._size / 2.
-		elif center_location == 'centered_bottom':
-			self._bb_center = self._size
-			self._bb_center[0] /= 2.
-		self._frames_center_location[state] = loc
+		else:	loc = [center_location] * len(frames)
+		clip = AnimationClip(frames, durations, loc)
+		if frames:
+			# bounding box: union of the areas where the frames of
+			# every state are drawn (at location - center)
+			sizes = np.array([img.get_size() for img in frames],
+								dtype=float)
+			lower = - clip.centers
+			upper = lower + sizes
+			if self._size.any():
+				lower = np.vstack([lower, - self._bb_center])
+				upper = np.vstack([upper,
+						self._size - self._bb_center])
+			lower, upper = lower.min(axis=0), upper.max(axis=0)
+			self._set_bb_center(- lower)
+			self._set_size(upper - lower)
+		self._owned_clips.add(clip)
+		self.set_clip(state, clip)
+		return clip
 
 	def get_frame_infos(self, time):
 		'''
     Return frame infos for a given time : image uuid, center location
 		'''
-		state = self._current_state
-		try:
-			frames = self._frames[state]
-		except KeyError:
-			state = '__default__'
-			frames = self._frames[state]
-			if len(frames) == 0: return None, None
-		refresh_delay = self._refresh_delay[state]
-		frames_center_location = self._frames_center_location[state]
-		frames_n = len(frames)
-		id = int((time % (refresh_delay * frames_n)) / refresh_delay)
-		return frames[id], frames_center_location[id]
+		clip = self._clips.get(self._current_state)
+		if clip is None:
+			clip = self._default_clip
+			if clip is None: return None, None
+		return clip.get_frame_infos(time)
 
 
 class StaticSprite(Sprite):
 	def __init__(self, name, context, layer=0):
 		Sprite.__init__(self, name, context, layer)
+		self._img_proxy = None
 
 	def load_from_filename(self, imgname, center_location=(0,0)):
 		gfx = Config.get_graphic_engine()
-		self._img_proxy = gfx.load_image(imgname)
-		width, height = self._img_proxy.get_size()
-		if width > self._size[0]:
-			self._size[0] = width
-		if height > self._size[1]:
-			self._size[1] = height
+		# loaded first: reloading the same file does not decode it again
+		img_proxy = gfx.load_image(imgname)
+		self.release_images()
+		self._img_proxy = img_proxy
+		self._set_size(np.maximum(self._size,
+					self._img_proxy.get_size()))
 		if isinstance(center_location, str):
 			if center_location == 'centered':
-				self._bb_center = self._size / 2.
+				self._set_bb_center(self._size / 2.)
 			elif center_location == 'centered_bottom':
-				self._bb_center = self._size.copy()
-				self._bb_center[0] /= 2.
+				self._set_bb_center(self._size * [0.5, 1.])
 		else:
-			self._bb_center = np.asarray(center_location)
+			self._set_bb_center(center_location)
 
 	def get_frame_infos(self, time=0):
 		return self._img_proxy, self._bb_center
 
+	def release_images(self):
+		if self._img_proxy is None: return
+		Config.get_graphic_engine().release_image(self._img_proxy)
+		self._img_proxy = None
+
 
 class UniformLayer(Sprite):
 	def __init__(self, name, context, layer=2, size=None,
@@ -193,14 +328,14 @@ class UniformLayer(Sprite):
 		if isinstance(center_location, str):
 			width, height = np.array(self._img_proxy.get_size())
 			if center_location == 'centered':
-				self._bb_center = np.array([width, height]) / 2.
+				self._set_bb_center(np.array([width, height]) / 2.)
 			elif center_location == 'centered_bottom':
-				self._bb_center = np.array([width / 2., height])
+				self._set_bb_center([width / 2., height])
 			elif center_location == 'top_left':
-				self._bb_center = np.array([0., 0.])
+				self._set_bb_center([0., 0.])
 		else:
-			self._bb_center = np.asarray(center_location)
-		self._size = size
+			self._set_bb_center(center_location)
+		self._set_size(self._img_proxy.get_size())
 		self.set_location(shift)
 
 	def get_frame_infos(self, time):
@@ -209,6 +344,8 @@ class UniformLayer(Sprite):
 
 
 class Dialog(Sprite):
+	cullable = False
+
 	def __init__(self, name='dialog', context=None, layer=2):
 		Sprite.__init__(self, name, context, layer)
 
@@ -218,6 +355,8 @@ class Dialog(Sprite):
 
 
 class Text(Sprite):
+	cullable = False
+
 	def __init__(self, name='text', context=None, layer=2,
 		text='...', font='Times New Roman', font_size=20):
 		Sprite.__init__(self, name, context, layer)
@@ -225,16 +364,23 @@ class Text(Sprite):
 		self.font = font
 		self.font_size = font_size
 		self.backend_repr = None
+		self._backend_repr_key = None
 
 	def update(self, dt): #FIXME : on devrait pas avoir a updater le dialog?
 		Sprite.update(self, dt) # for motions
-		self.backend_repr = Config.get_graphic_engine().load_text(\
-				self.text, self.font, self.font_size,
-				self._location[0], self._location[1])
+		# the label is only changed with text, font or size, its
+		# location is set by the graphic engine right before each draw
+		key = (self.text, self.font, self.font_size)
+		if key != self._backend_repr_key:
+			self.backend_repr = \
+				Config.get_graphic_engine().get_cached_text(*key)
+			self._backend_repr_key = key
 
 
 class FpsSprite(Sprite):
 	'''Compute and display current FPS (Frames per second) rate.'''
+	cullable = False
+
 	def __init__(self, name='fps', context=None, layer=3,
 		fg_color=(255, 255, 255), bg_color=(0, 0, 0)):
 		Sprite.__init__(self, name, context, layer)
@@ -246,6 +392,118 @@ class FpsSprite(Sprite):
 		pass
 
 
+class SpriteStore(StateMachine):
+	'''
+    Structure of arrays holding location, velocity, size and bounding box
+    center of many sprites in contiguous (N, 2) arrays. Stored sprites work
+    on views of their rows, so that they can all be moved with one
+    vectorized operation per frame (see update).
+
+    Moves done by update do not emit "location_changed" unless
+    emit_location_changed is True. Silently moved sprites are thus never
+    culled out of the screen views (see RenderList.set_cullable).
+	'''
+	def __init__(self, name='sprite_store', context=None, capacity=64,
+					emit_location_changed=False):
+		StateMachine.__init__(self, name, context)
+		self.location = np.zeros((capacity, 2))
+		self.velocity = np.zeros((capacity, 2))
+		self.size = np.zeros((capacity, 2))
+		self.center = np.zeros((capacity, 2))
+		self.emit_location_changed = emit_location_changed
+		self._sprites = []
+
+	def __len__(self):
+		return len(self._sprites)
+
+	def _bind(self, sprite, row):
+		sprite._store = self
+		sprite._store_row = row
+		sprite._location = self.location[row]
+		sprite._size = self.size[row]
+		sprite._bb_center = self.center[row]
+
+	def _grow(self):
+		n = len(self.location)
+		for name in ['location', 'velocity', 'size', 'center']:
+			array = np.zeros((2 * n, 2))
+			array[:n] = getattr(self, name)
+			setattr(self, name, array)
+		for row, sprite in enumerate(self._sprites):
+			self._bind(sprite, row)
+
+	def add(self, sprite, velocity=(0, 0)):
+		'''
+    Move sprite data into the store.
+
+    velocity : speed in world-coordinate metric per seconds.
+		'''
+		if sprite._store is not None:
+			raise ValueError("sprite '%s' is already stored" % \
+								sprite.name)
+		row = len(self._sprites)
+		if row == len(self.location): self._grow()
+		self.location[row] = sprite._location
+		self.velocity[row] = velocity
+		self.size[row] = sprite._size
+		self.center[row] = sprite._bb_center
+		self._sprites.append(sprite)
+		self._bind(sprite, row)
+		if not self.emit_location_changed:
+			self._get_render_list(sprite).set_cullable(sprite, False)
+
+	def _get_render_list(self, sprite):
+		context = sprite.get_context()
+		if context is None: context = Config.get_default_context()
+		return context.get_visible_data()
+
+	def remove(self, sprite):
+		'''
+    Give back its own data to sprite.
+		'''
+		row = sprite._store_row
+		sprite._location = self.location[row].copy()
+		sprite._size = self.size[row].copy()
+		sprite._bb_center = self.center[row].copy()
+		sprite._store = sprite._store_row = None
+		if not self.emit_location_changed:
+			self._get_render_list(sprite).set_cullable(sprite,
+							sprite.cullable)
+		# move the last sprite in the free row
+		last = len(self._sprites) - 1
+		if row != last:
+			for name in ['location', 'velocity', 'size', 'center']:
+				array = getattr(self, name)
+				array[row] = array[last]
+			last_sprite = self._sprites[last]
+			self._sprites[row] = last_sprite
+			self._bind(last_sprite, row)
+		self._sprites.pop()
+
+	def get_velocity(self, sprite):
+		return self.velocity[sprite._store_row]
+
+	def set_velocity(self, sprite, velocity):
+		self.velocity[sprite._store_row] = velocity
+
+	def bounding_boxes(self):
+		'''
+    Return the (N, 4) array of bounding boxes (x, y, w, h) of the sprites.
+		'''
+		n = len(self._sprites)
+		return np.hstack((self.location[:n] - self.center[:n],
+							self.size[:n]))
+
+	def update(self, dt):
+		n = len(self._sprites)
+		self.location[:n] += self.velocity[:n] * (dt / 1000.)
+		if not self.emit_location_changed: return
+		sprites = self._sprites
+		for row in np.flatnonzero(self.velocity[:n].any(axis=1)):
+			sprite = sprites[row]
+			sprite.emit("location_changed", sprite._location)
+
+
 #-------------------------------------------------------------------------------
 # XXX: la classe suivante se base sur des sprites, mais en realite seule la
 # position et la bounding box de l'objet est necessaire. Peut-etre nous
@@ -254,46 +512,111 @@ class FpsSprite(Sprite):
 #   une bounding box a du sens ? Eventuellement pour definir des boundings box
 #   associees a des zones invisibles / decorrelees de sprites.
 class CollisionManager(Object):
-	def __init__(self, name='collider_manager'):
+	def __init__(self, name='collider_manager', index=None):
+		'''
+    name :  name of the manager
+    index : spatial index of the collidable sprites (broad phase), see
+            nurse.spatial.UniformGrid. Default: UniformGrid().
+		'''
 		Object.__init__(self, name)
+		if index is None: index = UniformGrid()
+		self._index = index
 		self._collidable_sprites = []
+		self._collidable_order = {}
 		self._collidable_ref_sprite = None
 
 	def add_collidable_ref_sprite(self, sprite):
 		self._collidable_ref_sprite = sprite 
 
 	def add_collidable_sprite(self, sprite):
+		self._collidable_order[sprite] = len(self._collidable_sprites)
 		self._collidable_sprites.append(sprite)
+		self._index.add(sprite)
 
 	def add_collidable_sprites(self, sprites):
-		self._collidable_sprites += sprites
+		for sprite in sprites: self.add_collidable_sprite(sprite)
+
+	def remove_collidable_sprite(self, sprite):
+		self._collidable_sprites.remove(sprite)
+		self._collidable_order = dict((s, i) for i, s in \
+				enumerate(self._collidable_sprites))
+		self._index.remove(sprite)
 
 	def _collide(self, bb1, bb2):
-		x1, y1, w1, h1 = bb1
-		x2, y2, w2, h2 = bb2
-		x1_w = x1 + w1
-		y1_h = y1 + h1
-		x2_w = x2 + w2
-		y2_h = y2 + h2
-		points = [(x1, y1), (x1_w, y1), (x1_w, y1_h), (x1, y1_h)]
-		in_bb = False
-		for p in points:
-			if (p[0] >= x2) and (p[0] <= x2_w) and\
-				(p[1] >= y2) and (p[1] <= y2_h):
-				in_bb = True
-				break
-		return in_bb
+		return collide(bb1, bb2)
 
 # XXX: seul le premier sprite qui collide le sprite de ref voit son slot appele
-# On pourrait ajouter un mode ou tous les sprites entrant en collision voient
-# leur slot respectif appele.
-
-# XXX: bien sur on pourrait avoir une strategie plus intelligente pour trouver
-# le ou les sprites en collision : representation hierarchique par exemple.
+# (voir BatchCollisionManager pour notifier toutes les paires en collision).
 	def call_slot(self, slot, event):
 		sprite_bb = self._collidable_ref_sprite.bounding_box()
-		for sprite in self._collidable_sprites:
-			bb = sprite.bounding_box()
-			if self._collide(sprite_bb, bb):
-				sprite.call_slot(slot, event)
-				break
+		sprites = self._index.query(sprite_bb)
+		if not sprites: return
+		# first colliding sprite in the check list
+		sprite = min(sprites, key=self._collidable_order.__getitem__)
+		sprite.call_slot(slot, event)
+
+
+class BatchCollisionManager(StateMachine):
+	'''
+    Find every pair of colliding sprites once per frame (see
+    nurse.spatial.colliding_pairs) and emit one "collision" signal per pair
+    with (sprite1, sprite2) as signal data.
+
+    Bounding boxes are kept in a single (N, 4) array updated on
+    "location_changed". Other changes of a bounding box (size, center) must
+    be notified with update_sprite().
+	'''
+	def __init__(self, name='batch_collider_manager', context=None):
+		StateMachine.__init__(self, name, context)
+		self._sprites = []
+		self._rows = {}
+		self._trackers = []
+		self._boxes = np.zeros((16, 4))
+
+	def add_collidable_sprite(self, sprite):
+		n = len(self._sprites)
+		if n == len(self._boxes):
+			boxes = np.zeros((2 * n, 4))
+			boxes[:n] = self._boxes
+			self._boxes = boxes
+		self._rows[sprite] = n
+		self._sprites.append(sprite)
+		self._boxes[n] = sprite.bounding_box()
+		tracker = LocationTracker(self.update_sprite, sprite)
+		sprite.connect("location_changed", tracker,
+			"on_location_changed", asynchronous=False)
+		self._trackers.append(tracker)
+
+	def add_collidable_sprites(self, sprites):
+		for sprite in sprites: self.add_collidable_sprite(sprite)
+
+	def remove_collidable_sprite(self, sprite):
+		row = self._rows.pop(sprite)
+		tracker = self._trackers[row]
+		sprite.disconnect("location_changed", tracker,
+			"on_location_changed", asynchronous=False)
+		# move the last sprite in the free row
+		last = len(self._sprites) - 1
+		if row != last:
+			last_sprite = self._sprites[last]
+			self._sprites[row] = last_sprite
+			self._trackers[row] = self._trackers[last]
+			self._boxes[row] = self._boxes[last]
+			self._rows[last_sprite] = row
+		self._sprites.pop()
+		self._trackers.pop()
+
+	def update_sprite(self, sprite):
+		self._boxes[self._rows[sprite]] = sprite.bounding_box()
+
+	def get_colliding_pairs(self):
+		'''
+    Return the list of (sprite1, sprite2) currently colliding.
+		'''
+		sprites = self._sprites
+		pairs = colliding_pairs(self._boxes[:len(sprites)])
+		return [(sprites[i], sprites[j]) for i, j in pairs]
+
+	def update(self, dt):
+		for pair in self.get_colliding_pairs():
+			self.emit("collision", pair)
@@ -1,5 +1,6 @@
 from base import Object
 from config import Config
+from events import TransitionEvent
 
 
 class State(Object):
@@ -7,19 +8,31 @@ class State(Object):
 		Object.__init__(self, name)
 		self._fsm = None
 		self._assign_properties = []
+		# signal -> (sender, state, src_prop, dst_prop, asynchronous)
 		self._transitions = {}
 
 	def add_transition(self, sender, signal, state,
 			src_prop={}, dst_prop={}, asynchronous=True):
-		sender.connect(signal, self, "on_transition", asynchronous)
-		self._transitions[signal] = (sender, state, src_prop, dst_prop)
+		'''
+    Go to state when sender emits signal while self is the current state.
+    The transition is compiled in the table of the state machine of self
+    (see StateMachine.add_state).
+		'''
+		entry = (sender, state, src_prop, dst_prop, asynchronous)
+		self._transitions[signal] = entry
+		if self._fsm is not None:
+			self._fsm._add_transition_entry(self, signal, entry)
 
 	def assign_property(self, obj, name, value):
 		self._assign_properties.append((obj, name, value))
 
 	def remove_transition(self, transition):
+		'''
+    transition: signal of the transition to be removed.
+		'''
 		del self._transitions[transition]
-		self._initial_state = state
+		if self._fsm is not None:
+			self._fsm._remove_transition_entry(self, transition)
 
 	def is_receiving_events(self):
 		return self._fsm._current_state == self
@@ -34,7 +47,7 @@ class State(Object):
 		self.emit("exited")
 
 	def on_transition(self, event):
-		sender, state, src_prop, dst_prop = \
+		sender, state, src_prop, dst_prop, asynchronous = \
 			self._transitions[event.signal]
 		self._fsm.change_state(self, state, src_prop, dst_prop)
 
@@ -47,6 +60,10 @@ class StateMachine(State):
 		self._initial_state = None
 		self._possible_states = {}
 		self._current_state = None
+		# (state, signal) -> (sender, state, src_prop, dst_prop, asynchronous)
+		self._transition_table = {}
+		# (sender, signal) -> number of transitions
+		self._subscriptions = {}
 		if context is not None: context.add_fsm(self)
 		self._context = context
 
@@ -62,6 +79,27 @@ class StateMachine(State):
 		'''
 		pass
 
+	def needs_update(self):
+		'''
+    Return True if update must be called on each tick of the context. By
+    default, machines whose class does not override update are never
+    ticked. The answer is checked again each time the machine is woken
+    (see wake).
+		'''
+		return type(self).update.im_func is not StateMachine.update.im_func
+
+	def wake(self):
+		'''
+    Ask the context to check needs_update before its next update.
+		'''
+		if self._context is not None: self._context.wake_fsm(self)
+
+	def sleep(self):
+		'''
+    Stop calling update until the next wake.
+		'''
+		if self._context is not None: self._context.sleep_fsm(self)
+
 	def get_context(self):
 		return self._context
 
@@ -79,6 +117,39 @@ class StateMachine(State):
 	def add_state(self, state):
 		self._possible_states[state.name] = state
 		state._fsm = self
+		for signal, entry in state._transitions.items():
+			self._add_transition_entry(state, signal, entry)
+
+	def _add_transition_entry(self, state, signal, entry):
+		'''
+    Compile a transition of one of the states in the table of the machine.
+    The machine is connected once to each (sender, signal) used by its
+    transitions, whatever the number of states using it.
+
+    The connection is synchronous so that the transition is chosen from
+    the state current when the signal is emitted. Asynchronous transitions
+    are then queued (see on_transition_signal).
+		'''
+		key = (state, signal)
+		if key in self._transition_table:
+			self._remove_transition_entry(state, signal)
+		self._transition_table[key] = entry
+		subscription = (entry[0], signal)
+		count = self._subscriptions.get(subscription, 0)
+		if count == 0:
+			entry[0].connect(signal, self, "on_transition_signal",
+							asynchronous=False)
+		self._subscriptions[subscription] = count + 1
+
+	def _remove_transition_entry(self, state, signal):
+		entry = self._transition_table.pop((state, signal))
+		subscription = (entry[0], signal)
+		count = self._subscriptions[subscription] - 1
+		if count == 0:
+			del self._subscriptions[subscription]
+			entry[0].disconnect(signal, self, "on_transition_signal",
+							asynchronous=False)
+		else:	self._subscriptions[subscription] = count
 
 	def change_state(self, src, dst, src_prop={}, dst_prop={}):
 		if src != self._current_state: return
@@ -106,11 +177,37 @@ class StateMachine(State):
 		self.emit("stopped")
 
 	def is_receiving_events(self):
-		return True
+		# a machine nested as a state only receives events when current
+		return self._fsm is None or self._fsm._current_state is self
 
 	# slots
 	def on_entry(self):
 		self.start()
 
+	def on_wake(self, event):
+		self.wake()
+
 	def on_exit(self):
 		self.stop()
+
+	def on_transition_signal(self, event):
+		'''
+    Follow the transition of the current state for the emitted signal,
+    if any: one table lookup whatever the number of states. Asynchronous
+    transitions are queued in the event loop and dropped on delivery if
+    the machine is no longer in that state (see TransitionEvent).
+		'''
+		src = self._current_state
+		try:
+			sender, dst, src_prop, dst_prop, asynchronous = \
+				self._transition_table[src, event.signal]
+		except KeyError:
+			return
+		# same signal from another sender (an ObjectProxy shares the
+		# connections of the object it wraps)
+		if sender is not event.sender and sender._async_connections \
+			is not event.sender._async_connections: return
+		if asynchronous:
+			Config.get_event_loop().add_event(TransitionEvent(self,
+					src, dst, src_prop, dst_prop))
+		else:	self.change_state(src, dst, src_prop, dst_prop)
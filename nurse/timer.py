@@ -0,0 +1,123 @@
+import math
+import heapq
+
+
+''' Delayed and periodic signals driven by the event loop clock.
+.. module:: timer
+'''
+
+
+class Timer(object):
+	'''
+    Handle of a scheduled signal, returned by TimerService.add_timer.
+	'''
+	__slots__ = ('deadline', 'period', 'sender', 'signal', 'signal_data',
+			'active', '_service')
+
+	def __init__(self, service, deadline, period, sender, signal,
+							signal_data):
+		self._service = service
+		self.deadline = deadline
+		self.period = period
+		self.sender = sender
+		self.signal = signal
+		self.signal_data = signal_data
+		self.active = True
+
+	def cancel(self):
+		'''
+    Do not emit the signal anymore.
+		'''
+		if self.active:
+			self.active = False
+			self._service._on_cancel()
+
+
+class TimerService(object):
+	'''
+    Emit signals at given times of the event loop clock (see
+    EventLoop.clock): timers are kept in a heap sorted by deadline, so that
+    a tick without expired timer only costs one comparison whatever the
+    number of timers.
+
+    Signals are emitted by their sender with Object.emit: asynchronous
+    receivers get them when the next events are processed, synchronous
+    ones immediately, before the contexts are updated.
+	'''
+	def __init__(self, time=0., max_catch_up=5):
+		'''
+    time : float
+        current time of the clock (in ms).
+    max_catch_up : int
+        maximum number of signals emitted by a periodic timer in one update
+        when it is late. Beyond this limit missed periods are skipped.
+		'''
+		self.time = time
+		self.max_catch_up = max_catch_up
+		self._heap = [] # (deadline, rank, timer)
+		self._rank = 0 # same deadline: first added, first emitted
+		self._cancelled = 0
+
+	def __len__(self):
+		return len(self._heap) - self._cancelled
+
+	def add_timer(self, delay, sender, signal, signal_data=None,
+								period=None):
+		'''
+    Make sender emit signal (with signal_data) in delay ms, then every
+    period ms if period is not None.
+
+    Return a Timer, whose cancel method stops it.
+		'''
+		if period is not None and period <= 0:
+			raise ValueError('timer period must be positive')
+		timer = Timer(self, self.time + delay, period, sender,
+						signal, signal_data)
+		self._push(timer)
+		return timer
+
+	def _push(self, timer):
+		self._rank += 1
+		heapq.heappush(self._heap, (timer.deadline, self._rank, timer))
+
+	def _on_cancel(self):
+		self._cancelled += 1
+		# cancelled timers are dropped lazily, unless they prevail
+		if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+			self._heap = [item for item in self._heap \
+						if item[2].active]
+			heapq.heapify(self._heap)
+			self._cancelled = 0
+
+	def update(self, time):
+		'''
+    Emit the signals of timers expired at the given time (in ms).
+		'''
+		self.time = time
+		late = None # periodic timer -> signals emitted in this update
+		# receivers may add or cancel timers: self._heap is read again
+		while self._heap and self._heap[0][0] <= time:
+			deadline, rank, timer = heapq.heappop(self._heap)
+			if not timer.active:
+				self._cancelled -= 1
+				continue
+			if timer.period is None:
+				timer.active = False
+			else:
+				if late is None: late = {}
+				n = late[timer] = late.get(timer, 0) + 1
+				period = timer.period
+				deadline += period
+				if n >= self.max_catch_up and deadline <= time:
+					# overload: skip missed periods
+					deadline += period * (math.floor(
+						(time - deadline) / period) + 1)
+				timer.deadline = deadline
+				self._push(timer)
+			timer.sender.emit(timer.signal, timer.signal_data)
+
+	def clear(self):
+		for deadline, rank, timer in self._heap:
+			timer.active = False
+		self._heap = []
+		self._cancelled = 0
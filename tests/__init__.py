@@ -0,0 +1,21 @@
+''' Regression tests, run from the top directory with:
+    python -m unittest discover -s tests -t .
+'''
+from nurse.config import Config
+
+
+def init_null_backend():
+	'''
+    Create fresh headless backends and context manager for a test.
+	'''
+	from nurse.base import universe
+	from nurse.backends import GraphicEngine
+	from nurse.context import ContextManager
+	Config.backend = 'null'
+	Config.graphic_backend_instance = None
+	Config.event_loop_backend_instance = None
+	Config.keyboard_backend_instance = None
+	GraphicEngine.instances.clear()
+	Config.init()
+	universe.context_manager = ContextManager()
+	return universe.context_manager
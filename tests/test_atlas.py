@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from tests import init_null_backend
+from nurse.config import Config
+from nurse.backends.atlas import SkylinePacker
+
+
+class TestSkylinePacker(unittest.TestCase):
+	def test_no_overlap(self):
+		rng = random.Random(0)
+		packer = SkylinePacker(256, 256)
+		rects = []
+		while True:
+			w, h = rng.randint(1, 40), rng.randint(1, 40)
+			pos = packer.pack(w, h)
+			if pos is None: break
+			rects.append(pos + (w, h))
+		self.assertTrue(len(rects) > 20)
+		for i, (x, y, w, h) in enumerate(rects):
+			self.assertTrue(x >= 0 and y >= 0)
+			self.assertTrue(x + w <= 256 and y + h <= 256)
+			for ox, oy, ow, oh in rects[:i]:
+				self.assertFalse(x < ox + ow and ox < x + w and \
+						y < oy + oh and oy < y + h)
+
+	def test_full(self):
+		packer = SkylinePacker(10, 10)
+		self.assertEqual(packer.pack(10, 6), (0, 0))
+		self.assertEqual(packer.pack(4, 4), (0, 6))
+		self.assertEqual(packer.pack(6, 4), (4, 6))
+		self.assertEqual(packer.pack(1, 1), None)
+		self.assertEqual(packer.pack(11, 1), None)
+
+
+class TestTextureAtlas(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.gfx = Config.get_graphic_engine()
+		self.gfx.enable_atlas(1024, 1024)
+
+	def test_only_regions_are_cached(self):
+		proxies = [self.gfx.load_image(name) \
+				for name in ['perso.png', 'lit.png', 'perso.png']]
+		self.assertEqual(len(self.gfx.atlas), 2)
+		self.assertEqual(len(self.gfx.image_cache), 2)
+		for key, entry in self.gfx.image_cache._entries.items():
+			(sheet, pos, filename), size = entry[0]
+			self.assertEqual(sheet, 'atlas_sheet_0')
+
+	def test_release(self):
+		proxies = [self.gfx.load_image(name) \
+				for name in ['perso.png', 'lit.png', 'perso.png']]
+		for proxy in proxies: self.gfx.release_image(proxy)
+		# released images are kept until the cache drops them
+		self.assertEqual(len(self.gfx.atlas), 2)
+		self.gfx.image_cache.clear()
+		self.assertEqual(len(self.gfx.atlas), 0)
+		# the empty sheet was dropped
+		self.assertEqual(self.gfx.atlas.get_sheets(), [])
+		self.gfx.load_image('perso.png')
+		self.assertEqual([sheet for sheet, size in \
+			self.gfx.atlas.get_sheets()], ['atlas_sheet_1'])
+
+	def test_eviction(self):
+		self.gfx.image_cache.max_entries = 1
+		lit = self.gfx.load_image('lit.png')
+		self.gfx.release_image(lit)
+		self.gfx.load_image('perso.png')
+		# lit.png was evicted from the cache and the atlas
+		self.assertEqual(self.gfx.image_cache.evictions, 1)
+		self.assertEqual(len(self.gfx.atlas), 1)
+		self.assertEqual(len(self.gfx.atlas.get_sheets()), 1)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from nurse.base import Object
+
+
+class Receiver(Object):
+	def __init__(self, name='receiver'):
+		Object.__init__(self, name)
+		self.received = []
+
+	def on_signal(self, event):
+		self.received.append((self.name, event.signal))
+
+
+class TestDispatchCache(unittest.TestCase):
+	def test_connect_disconnect_invalidate(self):
+		sender, r1, r2 = Object('sender'), Receiver('r1'), Receiver('r2')
+		sender.connect('a', r1, 'on_signal', asynchronous=False)
+		sender.emit('a')
+		# cached receivers must see the new connection
+		sender.connect('a', r2, 'on_signal', asynchronous=False)
+		sender.emit('a')
+		sender.disconnect('a', r1, 'on_signal', asynchronous=False)
+		sender.emit('a')
+		self.assertEqual(r1.received, [('r1', 'a')] * 2)
+		self.assertEqual(r2.received, [('r2', 'a')] * 2)
+
+	def test_all_connections(self):
+		sender, r1, r2 = Object('sender'), Receiver('r1'), Receiver('r2')
+		sender.connect('a', r1, 'on_signal', asynchronous=False)
+		sender.emit('a')
+		sender.emit('b')
+		# '__all__' changes impact every cached signal
+		sender.connect('__all__', r2, 'on_signal', asynchronous=False)
+		sender.emit('a')
+		sender.emit('b')
+		sender.disconnect('__all__', r2, 'on_signal',
+						asynchronous=False)
+		sender.emit('b')
+		self.assertEqual(r1.received, [('r1', 'a')] * 2)
+		self.assertEqual(r2.received, [('r2', 'a'), ('r2', 'b')])
+
+
+class TestFanOut(unittest.TestCase):
+	def setUp(self):
+		from tests import init_null_backend
+		init_null_backend()
+
+	def test_signal_event_exported(self):
+		# examples use SignalEvent through "from nurse.base import *"
+		import nurse.base
+		self.assertTrue(hasattr(nurse.base, 'SignalEvent'))
+
+	def test_one_queued_event_per_emit(self):
+		from nurse.config import Config
+		loop = Config.get_event_loop()
+		sender, r1, r2 = Object('sender'), Receiver('r1'), Receiver('r2')
+		sender.connect('a', r1, 'on_signal')
+		sender.connect('a', r2, 'on_signal')
+		sender.emit('a')
+		self.assertEqual(loop.get_queue_depth(), 1)
+		loop.process_events()
+		self.assertEqual(r1.received, [('r1', 'a')])
+		self.assertEqual(r2.received, [('r2', 'a')])
+
+
+if __name__ == '__main__':
+	unittest.main()
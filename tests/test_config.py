@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import unittest
+
+from nurse.config import Config
+
+
+class TestBackendRegistry(unittest.TestCase):
+	def test_no_toolkit_imported(self):
+		# backends are only imported when instanciated
+		code = 'import sys, nurse.config; ' \
+			'print [m for m in ("pygame", "pyglet") ' \
+			'if m in sys.modules]'
+		output = subprocess.check_output([sys.executable, '-c', code])
+		self.assertEqual(output.strip(), '[]')
+
+	def test_register_backend(self):
+		registry = dict(Config.backend_registry)
+		try:
+			Config.register_backend('test', 'nurse.backends.null_backend',
+				'NullGraphicEngine', 'NullEventLoop',
+				'NullKeyBoardDevice')
+			backend = Config.backend
+			Config.backend = 'test'
+			try:
+				cls = Config._get_backend_class(2)
+			finally:
+				Config.backend = backend
+			from nurse.backends.null_backend import NullEventLoop
+			self.assertTrue(cls is NullEventLoop)
+		finally:
+			Config.backend_registry = registry
+
+
+if __name__ == '__main__':
+	unittest.main()
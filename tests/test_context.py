@@ -0,0 +1,122 @@
+import unittest
+
+import numpy as np
+
+from tests import init_null_backend
+from nurse.config import Config
+from nurse.backends import KeyBoardDevice
+from nurse.context import Context, RenderList
+from nurse.motion import KeyboardLeftRightArrowsMotion
+from nurse.sprite import Sprite, StaticSprite, Text
+
+
+class TestRenderList(unittest.TestCase):
+	def test_order(self):
+		data = RenderList()
+		data.add('c', 2)
+		data.add('a', 0)
+		data.add('d', 2)
+		data.add('b', 0)
+		self.assertEqual(data.items(), [(0, ('a', 'b')),
+						(2, ('c', 'd'))])
+		self.assertEqual(data.keys(), [0, 2])
+		self.assertEqual(data[2], ('c', 'd'))
+		self.assertEqual(data.get_draw_list(), ('a', 'b', 'c', 'd'))
+
+	def test_handles(self):
+		data = RenderList()
+		first = data.add('a', 1)
+		second = data.add('a', 3)
+		data.add('b', 1)
+		self.assertEqual(data.get_handles('a'), [first, second])
+		self.assertEqual(data.get_handles('a', 3), [second])
+		self.assertEqual(data.get_draw_list(), ('a', 'b', 'a'))
+		data.remove(first)
+		# cached lists are invalidated
+		self.assertEqual(data.get_draw_list(), ('b', 'a'))
+		data.remove(second)
+		self.assertEqual(data.get_handles('a'), [])
+		self.assertEqual(data.keys(), [1])
+		self.assertEqual(len(data), 1)
+
+	def test_cached_views(self):
+		init_null_backend()
+		context = Context('context')
+		sprites = [StaticSprite('sprite_%d' % i, context) \
+						for i in range(2)]
+		for i, sprite in enumerate(sprites):
+			sprite.load_from_filename('perso.png')
+			sprite.set_location(np.array([i * 500., 0.]))
+		data = context.get_visible_data()
+		view = (0, 0, 320, 200)
+		handles = data._get_visible_handles((view,))
+		self.assertTrue(data._get_visible_handles((view,)) is handles)
+		self.assertEqual(data.get_draw_list(view), (sprites[0],))
+		# the cached handles are dropped when a sprite moves
+		sprites[1].set_location(np.array([100., 0.]))
+		self.assertEqual(data.get_draw_list(view), tuple(sprites))
+
+
+class TestSetVisible(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.context = Context('context')
+
+	def test_set_visible(self):
+		sprite = Sprite('sprite', self.context, layer=2)
+		data = self.context.get_visible_data()
+		self.assertEqual(data.get_draw_list(), (sprite,))
+		self.context.set_visible(sprite, False)
+		self.assertEqual(data.get_draw_list(), ())
+		self.context.set_visible(sprite, True)
+		self.context.set_visible(sprite, True)
+		self.assertEqual(data.get_draw_list(), (sprite,))
+
+	def test_ambiguous_layer(self):
+		# sprites are visible in their layer once created
+		sprite = Sprite('sprite', self.context, layer=2)
+		self.context.add_visible_data(sprite, 5)
+		self.assertRaises(Exception, self.context.set_visible, sprite,
+									False)
+		self.context.set_visible(sprite, False, layer=5)
+		self.assertEqual(self.context.get_visible_data().get_handles(
+						sprite), [(2, 1)])
+
+
+class TestUpdateScheduling(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.context = Context('context')
+
+	def _press(self, type):
+		self.context.emit((type, KeyBoardDevice.constants.K_LEFT))
+		Config.get_event_loop().process_events()
+
+	def test_idle_sprites_sleep(self):
+		context = self.context
+		static = StaticSprite('static', context)
+		text = Text('text', context)
+		sprite = Sprite('sprite', context)
+		for fsm in (static, text, sprite): fsm.start()
+		sprite.set_motion(KeyboardLeftRightArrowsMotion(context=context,
+								speed=100.))
+		sprite.set_location(np.array([0., 0.]))
+		self.assertEqual(context.get_ticked_fsms(), [text])
+		self._press(KeyBoardDevice.constants.KEYDOWN)
+		self.assertEqual(context.get_ticked_fsms(), [text, sprite])
+		context.update(100.)
+		self.assertTrue(np.allclose(sprite.get_location(), [-10, 0]))
+		self._press(KeyBoardDevice.constants.KEYUP)
+		self.assertEqual(context.get_ticked_fsms(), [text])
+		context.update(100.)
+		self.assertTrue(np.allclose(sprite.get_location(), [-10, 0]))
+
+	def test_removed_fsm(self):
+		text = Text('text', self.context)
+		self.assertEqual(self.context.get_ticked_fsms(), [text])
+		self.context.remove_fsm(text)
+		self.assertEqual(self.context.get_ticked_fsms(), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from tests import init_null_backend
+from nurse.config import Config
+from nurse.context import Context
+from nurse.game.dialog import DialogState
+from nurse.sprite import Dialog
+
+
+class TestWordWrap(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+
+	def test_lines(self):
+		# null labels: 5 pixels per char with font size 10
+		state = DialogState('state', 'aaa bb cccccc d ee', font_size=10,
+						text_area=((0, 0), (50, 100)))
+		self.assertEqual(state._lines, ['aaa bb', 'cccccc d', 'ee'])
+
+	def test_long_word(self):
+		state = DialogState('state', 'a bbbbbbbbbbbb c', font_size=10,
+						text_area=((0, 0), (50, 100)))
+		self.assertEqual(state._lines, ['a', 'bbbbbbbbbbbb', 'c'])
+
+
+class TestTyping(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.loop = Config.get_event_loop()
+		self.dialog = Dialog('dialog', Context('context'))
+
+	def test_one_layout_per_line(self):
+		state = DialogState('state', 'abc de', font_size=10,
+				text_area=((0, 0), (20, 100)), char_per_sec=10.)
+		self.dialog.add_state(state)
+		self.dialog.set_initial_state(state)
+		self.dialog.start()
+		# one char every 100 ms
+		self.loop.advance_clock(350.)
+		self.assertEqual(len(state.list_backend_repr), 1)
+		label = state.list_backend_repr[0]
+		self.assertEqual((label.text, label.revealed), ('abc', 3))
+		self.loop.advance_clock(1000.)
+		self.assertEqual([(label.text, label.revealed) for label \
+			in state.list_backend_repr], [('abc', 3), ('de', 2)])
+		self.assertTrue(state._has_terminated)
+		# the typing timer is stopped once the text is shown
+		self.assertEqual(len(self.loop.timers), 0)
+
+
+if __name__ == '__main__':
+	unittest.main()
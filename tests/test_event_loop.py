@@ -0,0 +1,97 @@
+import unittest
+
+from nurse.backends import EventLoop, FrameClock
+
+
+class RecordedEvent(object):
+	def __init__(self, log, name):
+		self.log = log
+		self.name = name
+
+	def start(self):
+		self.log.append(self.name)
+
+
+class TestEventLoop(unittest.TestCase):
+	def _fill(self, loop, log, n):
+		for i in range(n):
+			loop.add_event(RecordedEvent(log, i))
+
+	def test_fifo(self):
+		loop, log = EventLoop(), []
+		self._fill(loop, log, 5)
+		loop.process_events()
+		self.assertEqual(log, range(5))
+		self.assertEqual(loop.stats['processed'], 5)
+
+	def test_events_added_while_processing_wait(self):
+		loop, log = EventLoop(), []
+		class Chained(RecordedEvent):
+			def start(self):
+				RecordedEvent.start(self)
+				loop.add_event(RecordedEvent(log, 'next'))
+		loop.add_event(Chained(log, 'first'))
+		loop.process_events()
+		self.assertEqual(log, ['first'])
+		self.assertEqual(loop.get_queue_depth(), 1)
+
+	def test_drop_oldest(self):
+		loop, log = EventLoop(max_pending_events=3), []
+		self._fill(loop, log, 5)
+		loop.process_events()
+		self.assertEqual(log, [2, 3, 4])
+		self.assertEqual(loop.stats['dropped'], 2)
+		self.assertEqual(loop.stats['max_depth'], 3)
+
+	def test_drop_newest(self):
+		loop, log = EventLoop(max_pending_events=3,
+			overflow_policy=EventLoop.DROP_NEWEST), []
+		self._fill(loop, log, 5)
+		loop.process_events()
+		self.assertEqual(log, [0, 1, 2])
+		self.assertEqual(loop.stats['dropped'], 2)
+
+	def test_invalid_limit(self):
+		self.assertRaises(ValueError, EventLoop, max_pending_events=0)
+
+	def test_time_budget(self):
+		# an exhausted budget still starts one event per frame
+		loop, log = EventLoop(time_budget=0), []
+		self._fill(loop, log, 3)
+		loop.process_events()
+		self.assertEqual(log, [0])
+		self.assertEqual(loop.get_queue_depth(), 2)
+		loop.process_events()
+		loop.process_events()
+		self.assertEqual(log, [0, 1, 2])
+
+
+class TestFrameClock(unittest.TestCase):
+	def test_pause_and_scale(self):
+		clock = FrameClock()
+		self.assertEqual(clock.advance(10.), 10.)
+		clock.pause()
+		self.assertEqual(clock.advance(10.), 0.)
+		self.assertEqual(clock.time, 10.)
+		clock.resume()
+		clock.set_scale(0.5)
+		self.assertEqual(clock.advance(10.), 5.)
+		self.assertEqual(clock.time, 15.)
+
+	def test_loop_clock(self):
+		from tests import init_null_backend
+		from nurse.config import Config
+		init_null_backend()
+		loop = Config.get_event_loop()
+		gfx = Config.get_graphic_engine()
+		start = loop.clock.time
+		loop.clock.set_scale(2.)
+		self.assertEqual(loop.advance_clock(8.), 16.)
+		loop.clock.pause()
+		self.assertEqual(loop.advance_clock(8.), 0.)
+		# animations see the game time of the loop
+		self.assertEqual(gfx.get_ticks(), start + 16.)
+
+
+if __name__ == '__main__':
+	unittest.main()
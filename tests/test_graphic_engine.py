@@ -0,0 +1,134 @@
+import unittest
+
+import numpy as np
+
+from tests import init_null_backend
+from nurse.config import Config
+from nurse.context import Context
+from nurse.backends import GraphicEngine
+from nurse.screen import VirtualScreenWorldCoordinates
+from nurse.sprite import Sprite, StaticSprite, UniformLayer, Text, \
+							FpsSprite, Dialog
+
+
+class Label(Text):
+	pass
+
+
+class CountingSprite(StaticSprite):
+	def __init__(self, name, context):
+		StaticSprite.__init__(self, name, context)
+		self.calls = 0
+
+	def get_frame_infos(self, time=0):
+		self.calls += 1
+		return StaticSprite.get_frame_infos(self, time)
+
+
+class TestDisplayDispatch(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.gfx = Config.get_graphic_engine()
+		self.context = Context('context')
+
+	def test_display_types(self):
+		context = self.context
+		expected = [(Sprite('a', context), 'sprite'),
+			(StaticSprite('b', context), 'sprite'),
+			(UniformLayer('c', context, size=(4, 4)), 'sprite'),
+			(Dialog('d', context), 'dialog'),
+			(Text('e', context), 'text'),
+			(Label('f', context), 'text'),
+			(FpsSprite('g', context), 'fps')]
+		for obj, type in expected:
+			self.assertEqual(self.gfx.get_display_type(obj), type)
+
+	def test_resolved_once_per_class(self):
+		resolved = []
+		resolve = self.gfx._resolve_display_type
+		def resolve_display_type(obj):
+			resolved.append(obj.__class__)
+			return resolve(obj)
+		self.gfx._resolve_display_type = resolve_display_type
+		displayed = []
+		def display(engine, screen, obj):
+			displayed.append(obj)
+		self.gfx.display_map = dict(self.gfx.display_map, text=display)
+		labels = [Label('label', self.context) for i in range(3)]
+		text = Text('text', self.context)
+		for obj in labels + [text] + labels:
+			self.gfx.display_object(None, obj)
+		self.assertEqual(displayed, labels + [text] + labels)
+		self.assertEqual(resolved, [Label, Text])
+
+
+class TestTextCache(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.gfx = Config.get_graphic_engine()
+		self.context = Context('context')
+
+	def test_shared_labels(self):
+		first = Text('first', self.context, text='score')
+		second = Text('second', self.context, text='score')
+		first.update(0.)
+		second.update(0.)
+		self.assertTrue(first.backend_repr is second.backend_repr)
+		label = first.backend_repr
+		first.text = 'game over'
+		first.update(0.)
+		self.assertFalse(first.backend_repr is label)
+		first.text = 'score'
+		first.update(0.)
+		self.assertTrue(first.backend_repr is label)
+		self.assertEqual(len(self.gfx._text_cache), 2)
+
+	def test_max_entries(self):
+		self.gfx.text_cache_max_entries = 4
+		text = Text('text', self.context)
+		for i in range(10):
+			text.text = str(i)
+			text.update(0.)
+		self.assertEqual(len(self.gfx._text_cache), 4)
+
+	def test_text_widths(self):
+		self.gfx.text_width_cache_max_entries = 3
+		for word in ['a', 'bb', 'a', 'ccc', 'dddd']:
+			self.gfx.get_text_width(word, font_size=10)
+		self.assertEqual(self.gfx.get_text_width('a', font_size=10), 5)
+		# 'bb', the least recently used width, was dropped
+		self.assertEqual([key[0] for key in self.gfx._text_widths],
+						['ccc', 'dddd', 'a'])
+
+
+class TestSharedRenderPass(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.gfx = Config.get_graphic_engine()
+		self.drawn = []
+		def draw_image(screen, raw_image, location, center=(0, 0)):
+			self.drawn.append((screen, raw_image))
+		self.gfx.draw_image = draw_image
+
+	def test_frames_resolved_once(self):
+		context = Context('context')
+		sprites = []
+		for i in range(4):
+			sprite = CountingSprite('sprite_%d' % i, context)
+			sprite.load_from_filename('perso.png')
+			sprite.set_location(np.array([i * 10., 0.]))
+			sprites.append(sprite)
+		screens = [VirtualScreenWorldCoordinates('screen_%d' % i,
+			(0, 0, 320, 200), focus=np.array([i * 5., 0.])) \
+							for i in range(3)]
+		for frame in range(2):
+			GraphicEngine.display_screens(self.gfx, screens,
+							context, time=0.)
+		for sprite in sprites: self.assertEqual(sprite.calls, 2)
+		self.assertEqual(len(self.drawn), 2 * 3 * 4)
+		self.assertEqual([screen for screen, raw in self.drawn[:12]],
+				[screen for screen in screens for i in range(4)])
+
+
+if __name__ == '__main__':
+	unittest.main()
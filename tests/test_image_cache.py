@@ -0,0 +1,88 @@
+import unittest
+
+from tests import init_null_backend
+from nurse.config import Config
+from nurse.context import Context
+from nurse.backends import ImageCache
+from nurse.sprite import AnimatedSprite, StaticSprite
+
+
+class TestImageCache(unittest.TestCase):
+	def test_lru_eviction(self):
+		cache = ImageCache(max_entries=2)
+		loaded = []
+		def loader(name):
+			loaded.append(name)
+			return name
+		for name in 'abc':
+			cache.acquire(name, lambda : loader(name), len)
+		# every image is referenced: nothing can be evicted
+		self.assertEqual(len(cache), 3)
+		cache.release('b')
+		self.assertEqual(cache.evictions, 1)
+		self.assertFalse('b' in cache)
+		# under budget: unreferenced images are kept
+		cache.release('a')
+		self.assertTrue('a' in cache)
+		cache.acquire('a', lambda : loader('a'), len)
+		cache.acquire('b', lambda : loader('b'), len)
+		self.assertEqual(loaded, ['a', 'b', 'c', 'b'])
+		self.assertEqual(cache.hits, 1)
+
+	def test_max_bytes(self):
+		cache = ImageCache(max_bytes=10)
+		for name in ['aaaa', 'bbbb', 'cccc']:
+			cache.acquire(name, lambda : name, len)
+			cache.release(name)
+		self.assertEqual(cache.nbytes, 8)
+		self.assertFalse('aaaa' in cache)
+
+
+class TestSpriteImages(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.gfx = Config.get_graphic_engine()
+		self.cache = self.gfx.image_cache
+		self.context = Context('context')
+
+	def get_refcount(self, filename):
+		key = (filename,) + self.gfx._get_image_load_options()
+		return self.cache._entries[key][2]
+
+	def test_static_sprite_reload(self):
+		sprite = StaticSprite('sprite', self.context)
+		sprite.load_from_filename('perso.png')
+		self.assertEqual(self.get_refcount('perso.png'), 1)
+		sprite.load_from_filename('hopital.png')
+		self.assertEqual(self.get_refcount('perso.png'), 0)
+		self.assertEqual(self.get_refcount('hopital.png'), 1)
+
+	def test_replaced_clip(self):
+		sprite = AnimatedSprite('sprite', self.context)
+		sprite.load_frames_from_filenames('__default__',
+				['perso.png', 'perso.png'], 'centered', 10)
+		self.assertEqual(self.get_refcount('perso.png'), 2)
+		# a clip shared by another state is kept
+		sprite.set_clip('walk', sprite.get_clip('__default__'))
+		sprite.load_frames_from_filenames('__default__',
+				['hopital.png'], 'centered', 10)
+		self.assertEqual(self.get_refcount('perso.png'), 2)
+		sprite.load_frames_from_filenames('walk',
+				['hopital.png'], 'centered', 10)
+		self.assertEqual(self.get_refcount('perso.png'), 0)
+		self.assertEqual(self.get_refcount('hopital.png'), 2)
+
+	def test_remove_sprite(self):
+		sprite = AnimatedSprite('sprite', self.context)
+		sprite.load_frames_from_filenames('__default__',
+				['perso.png'], 'centered', 10)
+		sprite.start()
+		self.context.remove_sprite(sprite)
+		self.assertEqual(self.get_refcount('perso.png'), 0)
+		self.assertEqual(self.context.get_visible_data().get_handles(
+							sprite), [])
+		self.assertFalse(sprite in self.context.get_ticked_fsms())
+
+
+if __name__ == '__main__':
+	unittest.main()
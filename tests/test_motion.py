@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from tests import init_null_backend
+from nurse.context import Context
+from nurse.sprite import Sprite, SpriteStore
+from nurse.motion import BatchPathMotion
+
+
+SQUARE = [(0, 0), (100, 0), (100, 100), (0, 100)]
+
+
+class TestBatchPathMotion(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.context = Context('context')
+
+	def test_locations(self):
+		motion = BatchPathMotion('motion', self.context)
+		sprites = [Sprite('sprite', self.context) for i in range(3)]
+		motion.add_sprite(sprites[0], SQUARE, speed=100.)
+		motion.add_sprite(sprites[1], SQUARE, speed=100., distance=150.)
+		motion.update(500.)
+		# added after a compilation
+		motion.add_sprite(sprites[2], [(0, 0), (10, 0)], speed=10.)
+		motion.update(500.)
+		expected = [(100, 0), (50, 100), (5, 0)]
+		for sprite, location in zip(sprites, expected):
+			self.assertTrue(np.allclose(sprite.get_location(),
+								location))
+		self.assertEqual(list(motion.segments), [1, 2, 0])
+
+	def test_store(self):
+		store = SpriteStore('store', self.context)
+		motion = BatchPathMotion('motion', self.context, store)
+		sprites = [Sprite('sprite', self.context) for i in range(50)]
+		for i, sprite in enumerate(sprites):
+			store.add(sprite)
+			motion.add_sprite(sprite, SQUARE, distance=i * 8.)
+		motion.update(1000.)
+		locations = motion.get_locations()
+		for sprite, location in zip(sprites, locations):
+			self.assertTrue(np.allclose(sprite.get_location(),
+								location))
+		self.assertTrue(np.allclose(sprites[0].get_location(),
+								(100, 0)))
+
+
+	def test_store_culling(self):
+		data = self.context.get_visible_data()
+		for emit in (False, True):
+			store = SpriteStore('store', self.context,
+						emit_location_changed=emit)
+			motion = BatchPathMotion('motion', self.context, store)
+			sprite = Sprite('sprite', self.context)
+			store.add(sprite)
+			sprite._set_size((10, 10))
+			# cells of the default grid are 256 pixels wide
+			motion.add_sprite(sprite, [(0, 0), (1000, 0)],
+							speed=1000.)
+			motion.update(0.)
+			self.assertTrue(sprite in data.get_draw_list((-5, -5,
+								30, 30)))
+			motion.update(600.)
+			self.assertTrue(sprite in data.get_draw_list((590, -5,
+								30, 30)))
+			if emit: # culled out of its former cell
+				self.assertFalse(sprite in data.get_draw_list(
+							(-5, -5, 30, 30)))
+			self.context.remove_sprite(sprite)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from tests import init_null_backend
+from nurse.base import Object
+from nurse.config import Config
+from nurse.backends import KeyBoardDevice
+
+
+class KeyRecorder(Object):
+	def __init__(self):
+		Object.__init__(self, 'key_recorder')
+		self.keys = []
+
+	def on_key(self, event):
+		self.keys.append(event.signal)
+
+
+class TestNullBackend(unittest.TestCase):
+	def setUp(self):
+		from nurse.context import Context
+		self.context_manager = init_null_backend()
+		context = Context('context')
+		self.context_manager.add_state(context)
+		self.context_manager.set_initial_state(context)
+		self.context_manager.start()
+
+	def test_virtual_clock(self):
+		loop = Config.get_event_loop()
+		loop.start(max_ticks=30)
+		self.assertEqual(loop.ticks, 30)
+		self.assertAlmostEqual(loop.clock.time, 30 * 1000. / loop.fps)
+
+	def test_scripted_keys(self):
+		device = Config.get_keyboard_device()
+		recorder = KeyRecorder()
+		device.connect('__all__', recorder, 'on_key',
+						asynchronous=False)
+		down = (KeyBoardDevice.constants.KEYDOWN,
+			KeyBoardDevice.constants.K_SPACE)
+		up = (KeyBoardDevice.constants.KEYUP,
+			KeyBoardDevice.constants.K_SPACE)
+		device.push_event(*down)
+		device.push_event(*up)
+		Config.get_event_loop().tick(10.)
+		self.assertEqual(recorder.keys, [down, up])
+
+
+if __name__ == '__main__':
+	unittest.main()
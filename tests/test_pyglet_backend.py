@@ -0,0 +1,236 @@
+import sys
+import types
+import unittest
+
+import numpy as np
+
+from tests import init_null_backend
+from nurse.backends import GraphicEngine
+from nurse.context import Context
+from nurse.screen import VirtualScreenWorldCoordinates
+from nurse.sprite import StaticSprite, Text
+
+try:
+	import pyglet
+except ImportError:
+	pyglet = None
+
+
+class FakeSprite(object):
+	'''
+    Only the batch of a pyglet sprite is used by PygletSpriteRun.
+	'''
+	def __init__(self, name):
+		self.name = name
+		self.batch = None
+
+
+@unittest.skipIf(pyglet is None, 'pyglet is not available')
+class TestPygletSpriteRun(unittest.TestCase):
+	def setUp(self):
+		from nurse.backends.pyglet_backend import PygletSpriteRun
+		self.run = PygletSpriteRun()
+		self.sprites = [FakeSprite(name) for name in 'abcd']
+
+	def test_append_in_order(self):
+		a, b, c, d = self.sprites
+		batch = self.run.batch
+		self.run.set_sprites([a, c])
+		self.run.set_sprites([a, b, c])
+		# b drawn before c but allocated after it
+		self.assertFalse(self.run.batch is batch)
+		self.assertEqual(self.run._members, [a, b, c])
+		batch = self.run.batch
+		# hidden members and new sprites at the end keep the batch
+		self.run.set_sprites([b, d])
+		self.assertTrue(self.run.batch is batch)
+		self.assertEqual(self.run._members, [a, b, c, d])
+		for sprite in self.sprites:
+			self.assertTrue(sprite.batch is batch)
+
+	def test_remove(self):
+		a, b, c, d = self.sprites
+		self.run.set_sprites([a, b, c])
+		self.run.remove(b)
+		self.assertEqual(self.run._ranks, {a : 0, c : 1})
+
+
+class StubSprite(object):
+	'''
+    pyglet.sprite.Sprite, recording batch changes and visibility toggles.
+	'''
+	height = 10
+
+	def __init__(self, name):
+		self.name = name
+		self.position = (0, 0)
+		self._visible = True
+		self._batch = None
+		self.batch_changes = 0
+		self.toggles = 0
+
+	def set_position(self, x, y):
+		self.position = (x, y)
+
+	def _get_visible(self):
+		return self._visible
+
+	def _set_visible(self, visible):
+		self.toggles += 1
+		self._visible = visible
+
+	def _get_batch(self):
+		return self._batch
+
+	def _set_batch(self, batch):
+		self.batch_changes += 1
+		self._batch = batch
+
+	visible = property(_get_visible, _set_visible)
+	batch = property(_get_batch, _set_batch)
+
+
+class StubBatch(object):
+	drawn = [] # batches, in drawing order
+
+	def draw(self):
+		StubBatch.drawn.append(self)
+
+
+def load_stubbed_backend():
+	'''
+    Import nurse.backends.pyglet_backend with a minimal fake pyglet and
+    return the module. sys.modules is left untouched.
+	'''
+	names = ['pyglet', 'pyglet.gl', 'pyglet.window', 'pyglet.window.key',
+		'pyglet.sprite', 'pyglet.graphics', 'pyglet.resource',
+		'pyglet.clock', 'pyglet.app', 'pyglet.event', 'pyglet.image',
+		'pyglet.text', 'nurse.backends.pyglet_backend']
+	saved = dict((name, sys.modules.get(name)) for name in names)
+	modules = dict((name, types.ModuleType(name)) for name in names[:-1])
+	for name, module in modules.items():
+		if '.' not in name: continue
+		parent, child = name.rsplit('.', 1)
+		setattr(modules[parent], child, module)
+	gl = modules['pyglet.gl']
+	for name in ['glBlendFunc', 'glDisable', 'glEnable', 'glLoadIdentity',
+		'glMatrixMode', 'glOrtho', 'glPopMatrix', 'glPushMatrix',
+		'glTranslatef', 'glViewport']:
+		setattr(gl, name, lambda *args: None)
+	for name in ['GL_BLEND', 'GL_MODELVIEW', 'GL_ONE_MINUS_SRC_ALPHA',
+		'GL_PROJECTION', 'GL_QUADS', 'GL_SRC_ALPHA']:
+		setattr(gl, name, name)
+	key = modules['pyglet.window.key']
+	keys = [chr(i) for i in range(ord('A'), ord('Z') + 1)] + \
+		['NUM_%d' % i for i in range(10)] + ['UP', 'DOWN', 'LEFT',
+		'RIGHT', 'ESCAPE', 'SPACE', 'RETURN']
+	for i, name in enumerate(keys): setattr(key, name, i)
+	modules['pyglet.window'].Window = \
+		lambda width, height, caption: types.ModuleType('window')
+	modules['pyglet.sprite'].Sprite = StubSprite
+	modules['pyglet.graphics'].Batch = StubBatch
+	resource = modules['pyglet.resource']
+	resource.path = []
+	resource.reindex = lambda: None
+	modules['pyglet.clock'].ClockDisplay = lambda: None
+	sys.modules.update(modules)
+	sys.modules.pop('nurse.backends.pyglet_backend', None)
+	try:
+		import nurse.backends.pyglet_backend as backend
+	finally:
+		for name, module in saved.items():
+			if module is None: sys.modules.pop(name, None)
+			else: sys.modules[name] = module
+	return backend
+
+
+class StubFrame(object):
+	def __init__(self, raw):
+		self.raw = raw
+
+	def get_raw_image(self):
+		return self.raw
+
+
+class PygletSprite(StaticSprite):
+	def __init__(self, name, context):
+		StaticSprite.__init__(self, name, context)
+		self.raw = StubSprite(name)
+		self.calls = 0
+
+	def get_frame_infos(self, time=0):
+		self.calls += 1
+		return StubFrame(self.raw), (0, 0)
+
+
+class TestPygletDisplayScreens(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		backend = load_stubbed_backend()
+		self.gfx = backend.PygletGraphicEngine((640, 200), 'test')
+		self.gfx._win.height = 200
+		del StubBatch.drawn[:]
+
+	def tearDown(self):
+		del GraphicEngine.instances[type(self.gfx)]
+
+	def test_two_screens(self):
+		context = Context('context')
+		sprites = []
+		# seen by the first screen, by the second one, and by none
+		for i, x in enumerate([0., 1000., 5000.]):
+			sprite = PygletSprite('sprite_%d' % i, context)
+			sprite.load_from_filename('perso.png')
+			sprite.set_location(np.array([x, 0.]))
+			sprites.append(sprite)
+		screens = [VirtualScreenWorldCoordinates('screen_%d' % i,
+			(320 * i, 0, 320, 200), focus=np.array([x, 0.])) \
+			for i, x in enumerate([0., 1000.])]
+		self.gfx.display_screens(screens, context, time=0.)
+		first, second, hidden = [sprite.raw for sprite in sprites]
+		changes = [raw.batch_changes for raw in (first, second, hidden)]
+		toggles = [raw.toggles for raw in (first, second, hidden)]
+		batch = first.batch
+		for frame in range(3):
+			del StubBatch.drawn[:]
+			self.gfx.display_screens(screens, context, time=0.)
+			# one shared batch, drawn once per screen
+			self.assertEqual(StubBatch.drawn, [batch, batch])
+		self.assertTrue(second.batch is batch)
+		self.assertTrue(hidden.batch is None)
+		self.assertTrue(first.visible and second.visible)
+		self.assertEqual([raw.batch_changes for raw in \
+			(first, second, hidden)], changes)
+		self.assertEqual([raw.toggles for raw in \
+			(first, second, hidden)], toggles)
+		# frames resolved once per frame, culled sprites not at all
+		self.assertEqual([sprite.calls for sprite in sprites], [4, 4, 0])
+
+	def test_shared_pass(self):
+		context = Context('context')
+		first = PygletSprite('first', context)
+		text = Text('text', context, layer=0)
+		second = PygletSprite('second', context)
+		for sprite in (first, second):
+			sprite.load_from_filename('perso.png')
+		def display_text(gfx, screen, text):
+			StubBatch.drawn.append(screen)
+		self.gfx._display_cache[Text] = ('text', display_text)
+		# overlapping views
+		screens = [VirtualScreenWorldCoordinates('screen_%d' % i,
+			(320 * i, 0, 320, 200), focus=np.array([i * 10., 0.])) \
+			for i in range(2)]
+		for frame in range(2):
+			del StubBatch.drawn[:]
+			self.gfx.display_screens(screens, context, time=0.)
+			# the text is drawn between the runs of the sprites
+			batches = [first.raw.batch, second.raw.batch]
+			self.assertEqual(StubBatch.drawn, [batches[0], screens[0],
+				batches[1], batches[0], screens[1], batches[1]])
+		self.assertFalse(batches[0] is batches[1])
+		# frames resolved once per frame, not once per screen
+		self.assertEqual((first.calls, second.calls), (2, 2))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,188 @@
+import os
+import time
+import unittest
+
+import numpy as np
+
+try:
+	import pygame
+except ImportError:
+	pygame = None
+
+from tests import init_null_backend
+from nurse.config import Config
+from nurse.backends import GraphicEngine
+
+
+@unittest.skipIf(pygame is None, 'pygame is not available')
+class TestSdlEventLoopWait(unittest.TestCase):
+	def setUp(self):
+		from nurse.backends.sdl_backend import SdlEventLoop, \
+							SdlKeyBoardDevice
+		os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+		init_null_backend()
+		pygame.display.init()
+		pygame.display.set_mode((16, 16))
+		pygame.event.clear()
+		self.handled = handled = []
+		class Device(SdlKeyBoardDevice):
+			def handle_event(self, event):
+				if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+					handled.append((event.type, event.key))
+		self._device = Config.keyboard_backend_instance
+		Config.keyboard_backend_instance = Device()
+		self.loop = SdlEventLoop()
+
+	def tearDown(self):
+		pygame.time.set_timer(pygame.USEREVENT, 0)
+		Config.keyboard_backend_instance = self._device
+		pygame.display.quit()
+
+	def test_arguments(self):
+		from nurse.backends.sdl_backend import SdlEventLoop
+		loop = SdlEventLoop(30., 0.5, max_catch_up=2)
+		self.assertEqual((loop.fps, loop.time_budget, loop.max_catch_up),
+								(30., 0.5, 2))
+		self.assertEqual(SdlEventLoop().max_catch_up, 5)
+
+	def test_short_delay_does_not_block(self):
+		# safety net: wakes the loop if the timeout is ignored
+		pygame.time.set_timer(pygame.USEREVENT, 500)
+		begin = time.time()
+		self.loop._wait(0.3)
+		self.assertTrue(time.time() - begin < 0.25)
+
+	def test_events_keep_their_order(self):
+		for type in (pygame.KEYDOWN, pygame.KEYUP):
+			pygame.event.post(pygame.event.Event(type,
+							key=pygame.K_a))
+		device = Config.get_keyboard_device()
+		self.loop._wait(100)
+		for i in range(4): device.read_events()
+		self.assertEqual(self.handled, [(pygame.KEYDOWN, pygame.K_a),
+						(pygame.KEYUP, pygame.K_a)])
+
+
+@unittest.skipIf(pygame is None, 'pygame is not available')
+class TestSdlAtlas(unittest.TestCase):
+	def setUp(self):
+		from nurse.backends.sdl_backend import SdlGraphicEngine
+		os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+		init_null_backend()
+		self.gfx = SdlGraphicEngine((320, 240), flags=0)
+		self.gfx._img_path = os.path.join(os.path.dirname(__file__),
+							'..', 'data', 'pix')
+		self.names = ['perso.png', 'lit.png', 'malade.png']
+
+	def tearDown(self):
+		del GraphicEngine.instances[type(self.gfx)]
+		pygame.display.quit()
+
+	def _render(self, surfaces):
+		screen = self.gfx._screen
+		screen.fill((0, 0, 0))
+		for i, surface in enumerate(surfaces):
+			screen.blit(surface, (i * 50, i * 30))
+		return pygame.image.tostring(screen, 'RGB')
+
+	def test_same_pixels(self):
+		surfaces = []
+		for name in self.names:
+			surface = self.gfx._decode_image(name)
+			# the RLE blitter rounds alpha blending differently
+			surface.set_colorkey(self.gfx._alpha_color,
+						pygame.constants.SRCCOLORKEY)
+			surfaces.append(surface)
+		expected = self._render(surfaces)
+		self.gfx.enable_atlas(512, 512)
+		regions = [self.gfx.load_image(name).get_raw_image() \
+						for name in self.names]
+		self.assertEqual(len(self.gfx.atlas.get_sheets()), 1)
+		self.assertTrue(self._render(regions) == expected)
+
+
+@unittest.skipIf(pygame is None, 'pygame is not available')
+class TestSdlDirtyRendering(unittest.TestCase):
+	def setUp(self):
+		from nurse.backends.sdl_backend import SdlGraphicEngine
+		from nurse.context import Context
+		from nurse.screen import VirtualScreenWorldCoordinates
+		from nurse.sprite import StaticSprite
+		os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+		init_null_backend()
+		self.gfx = SdlGraphicEngine((320, 240), flags=0)
+		self.gfx.dirty_rendering = True
+		self.gfx._img_path = os.path.join(os.path.dirname(__file__),
+							'..', 'data', 'pix')
+		Config.graphic_backend_instance = self.gfx
+		self.screen = VirtualScreenWorldCoordinates('screen',
+				(0, 0, 320, 240), focus=np.array([160, 120]))
+		self.context = Context('context')
+		self.sprites = []
+		for i, name in enumerate(['perso.png', 'lit.png', 'perso.png']):
+			sprite = StaticSprite('sprite_%d' % i, self.context,
+								layer=i)
+			sprite.load_from_filename(name)
+			sprite.set_location(np.array([i * 60., i * 40.]))
+			sprite.start()
+			self.sprites.append(sprite)
+
+	def tearDown(self):
+		del GraphicEngine.instances[type(self.gfx)]
+		pygame.display.quit()
+
+	def _frame(self):
+		self.gfx.clean()
+		self.screen.display_context(self.context)
+		self.gfx.flip()
+		return pygame.image.tostring(self.gfx._screen, 'RGB')
+
+	def test_same_pixels_as_full_redraw(self):
+		for i in range(12):
+			sprite = self.sprites[i % 3]
+			if i % 4 != 3:
+				sprite.set_location(sprite.get_location() + (7, 3))
+			pixels = self._frame()
+			self.assertEqual(len(self.gfx._previous_draw_list), 3)
+			self.gfx._redraw_all(self.gfx._previous_draw_list)
+			expected = pygame.image.tostring(self.gfx._screen, 'RGB')
+			self.assertTrue(pixels == expected)
+
+	def _flip(self, surfaces):
+		for surface, pos in surfaces: self.gfx._blit(surface, pos)
+		self.gfx.flip()
+		return pygame.image.tostring(self.gfx._screen, 'RGB')
+
+	def _expected(self):
+		self.gfx._redraw_all(self.gfx._previous_draw_list)
+		return pygame.image.tostring(self.gfx._screen, 'RGB')
+
+	def test_draw_order_swap(self):
+		red, blue = pygame.Surface((20, 20)), pygame.Surface((20, 20))
+		red.fill((255, 0, 0))
+		blue.fill((0, 0, 255))
+		self._flip([(red, (10, 10)), (blue, (20, 20))])
+		pixels = self._flip([(blue, (20, 20)), (red, (10, 10))])
+		self.assertEqual(self.gfx._screen.get_at((25, 25))[:3],
+								(255, 0, 0))
+		self.assertTrue(pixels == self._expected())
+
+	def test_invalidate(self):
+		surface = pygame.Surface((20, 20))
+		surface.fill((255, 0, 0))
+		self._flip([(surface, (10, 10))])
+		surface.fill((0, 255, 0))
+		self.gfx.invalidate((10, 10, 20, 20))
+		pixels = self._flip([(surface, (10, 10))])
+		self.assertEqual(self.gfx._screen.get_at((15, 15))[:3],
+								(0, 255, 0))
+		self.assertTrue(pixels == self._expected())
+		surface.fill((0, 0, 255))
+		self.gfx.invalidate()
+		self._flip([(surface, (10, 10))])
+		self.assertEqual(self.gfx._screen.get_at((15, 15))[:3],
+								(0, 0, 255))
+
+
+if __name__ == '__main__':
+	unittest.main()
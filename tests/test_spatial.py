@@ -0,0 +1,81 @@
+import random
+import unittest
+
+import numpy as np
+
+from nurse.base import Object
+from nurse.spatial import UniformGrid, collide, colliding_pairs
+
+
+class Box(Object):
+	def __init__(self, bb):
+		Object.__init__(self, 'box')
+		self.bb = bb
+
+	def bounding_box(self):
+		return self.bb
+
+	def move(self, x, y):
+		self.bb = (x, y) + tuple(self.bb[2:])
+		self.emit('location_changed', (x, y))
+
+
+def random_bb(rng):
+	return (rng.uniform(-500, 500), rng.uniform(-500, 500),
+		rng.uniform(0, 150), rng.uniform(0, 150))
+
+
+class TestUniformGrid(unittest.TestCase):
+	def _check(self, grid, boxes, rng):
+		for i in range(50):
+			bb = random_bb(rng)
+			expected = set(box for box in boxes \
+					if collide(bb, box.bounding_box()))
+			self.assertEqual(set(grid.query(bb)), expected)
+
+	def test_query_matches_brute_force(self):
+		rng = random.Random(0)
+		grid = UniformGrid(64.)
+		boxes = [Box(random_bb(rng)) for i in range(200)]
+		for box in boxes: grid.add(box)
+		self._check(grid, boxes, rng)
+		# moves are followed through "location_changed"
+		for box in boxes[:100]:
+			box.move(rng.uniform(-500, 500), rng.uniform(-500, 500))
+		self._check(grid, boxes, rng)
+		for box in boxes[100:]: grid.remove(box)
+		self.assertEqual(len(grid), 100)
+		self._check(grid, boxes[:100], rng)
+
+	def test_removed_object_not_tracked(self):
+		grid = UniformGrid(10.)
+		box = Box((0, 0, 5, 5))
+		grid.add(box)
+		grid.remove(box)
+		box.move(100, 100)
+		self.assertFalse(box in grid)
+		self.assertEqual(grid.query((0, 0, 200, 200)), [])
+
+
+class TestCollidingPairs(unittest.TestCase):
+	def test_matches_brute_force(self):
+		rng = random.Random(1)
+		boxes = [random_bb(rng) for i in range(300)]
+		# touching borders and duplicated x are colliding
+		boxes += [(0, 0, 10, 10), (10, 10, 5, 5), (0, 50, 10, 10)]
+		expected = set((i, j) for i in range(len(boxes)) \
+			for j in range(i + 1, len(boxes)) \
+			if collide(boxes[i], boxes[j]))
+		pairs = colliding_pairs(np.array(boxes))
+		self.assertEqual(set(map(tuple, pairs)), expected)
+		self.assertEqual(len(pairs), len(expected))
+
+	def test_no_pair(self):
+		self.assertEqual(colliding_pairs(np.zeros((0, 4))).shape, (0, 2))
+		self.assertEqual(colliding_pairs([(0, 0, 1, 1)]).shape, (0, 2))
+		self.assertEqual(colliding_pairs([(0, 0, 1, 1),
+					(5, 5, 1, 1)]).shape, (0, 2))
+
+
+if __name__ == '__main__':
+	unittest.main()
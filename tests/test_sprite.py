@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+from tests import init_null_backend
+from nurse.context import Context
+from nurse.sprite import Sprite, SpriteStore, AnimationClip, \
+							AnimatedSprite
+
+
+class TestSpriteStore(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.context = Context('context')
+
+	def test_grow_update_remove(self):
+		store = SpriteStore('store', self.context, capacity=2)
+		sprites = []
+		for i in range(5):
+			sprite = Sprite('sprite_%d' % i, self.context)
+			sprite.set_location(np.array([i, 0.]))
+			store.add(sprite, velocity=(1000., i * 1000.))
+			sprites.append(sprite)
+		store.update(10.)
+		for i, sprite in enumerate(sprites):
+			self.assertTrue(np.allclose(sprite.get_location(),
+						[i + 10., i * 10.]))
+		store.remove(sprites[1])
+		# the removed sprite keeps its data, the others their rows
+		self.assertTrue(np.allclose(sprites[1].get_location(),
+								[11., 10.]))
+		store.update(10.)
+		self.assertTrue(np.allclose(sprites[1].get_location(),
+								[11., 10.]))
+		self.assertTrue(np.allclose(sprites[4].get_location(),
+								[24., 80.]))
+		self.assertEqual(len(store), 4)
+		self.assertEqual(store.bounding_boxes().shape, (4, 4))
+
+
+class TestAnimationClip(unittest.TestCase):
+	def _get_frames(self, clip, times):
+		return [clip.get_frame_infos(time)[0] for time in times]
+
+	def test_uniform_durations(self):
+		clip = AnimationClip('abc', 100., [(0, 0), (1, 2), (3, 4)])
+		self.assertEqual(clip.total, 300.)
+		self.assertEqual(self._get_frames(clip,
+			[0., 99.9, 100., 250., 300., 410.]),
+			['a', 'a', 'b', 'c', 'a', 'b'])
+		frame, center = clip.get_frame_infos(150.)
+		self.assertEqual(list(center), [1, 2])
+
+	def test_variable_durations(self):
+		clip = AnimationClip('abc', [50., 100., 25.], (5, 5))
+		self.assertEqual(self._get_frames(clip,
+			[0., 49., 50., 149., 150., 174., 175., 225.]),
+			['a', 'a', 'b', 'b', 'c', 'c', 'a', 'b'])
+		self.assertEqual(list(clip.get_frame_infos(160.)[1]), [5, 5])
+
+	def test_empty(self):
+		clip = AnimationClip([], [], (0, 0))
+		self.assertEqual(len(clip), 0)
+		self.assertEqual(clip.get_frame_infos(10.), (None, None))
+
+	def test_invalid_durations(self):
+		self.assertRaises(ValueError, AnimationClip, 'ab', 0., (0, 0))
+		self.assertRaises(ValueError, AnimationClip, 'ab', [10., -10.],
+								(0, 0))
+
+
+class TestAnimatedSprite(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.sprite = AnimatedSprite('sprite', Context('context'))
+
+	def test_bounding_box(self):
+		# perso.png: 45x62, lit.png: 188x100
+		sprite = self.sprite
+		sprite.load_frames_from_filenames('__default__',
+			['perso.png', 'lit.png'], [(0, 0), (10, 20)])
+		self.assertEqual(sprite.bounding_box(), (-10, -20, 188, 100))
+		# union with the frames of the other states
+		sprite.load_frames_from_filenames('other', ['perso.png'],
+								'centered')
+		self.assertEqual(sprite.bounding_box(),
+					(-22.5, -31, 200.5, 111))
+
+
+if __name__ == '__main__':
+	unittest.main()
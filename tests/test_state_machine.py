@@ -0,0 +1,88 @@
+import unittest
+
+from tests import init_null_backend
+from nurse.base import Object
+from nurse.config import Config
+from nurse.state_machine import State, StateMachine
+
+
+class TestTransitions(unittest.TestCase):
+	def setUp(self):
+		init_null_backend()
+		self.loop = Config.get_event_loop()
+		self.sender = Object('sender')
+		self.fsm = StateMachine('fsm')
+		self.states = [State(name) for name in 'ABC']
+		for state in self.states: self.fsm.add_state(state)
+		self.fsm.set_initial_state(self.states[0])
+
+	def _chain(self, asynchronous):
+		a, b, c = self.states
+		a.add_transition(self.sender, 'next', b,
+					asynchronous=asynchronous)
+		b.add_transition(self.sender, 'next', c,
+					asynchronous=asynchronous)
+		self.fsm.start()
+
+	def test_no_chained_transitions(self):
+		self._chain(True)
+		# both signals are emitted while A is current
+		self.sender.emit('next')
+		self.sender.emit('next')
+		self.assertTrue(self.fsm._current_state is self.states[0])
+		self.loop.process_events()
+		self.assertTrue(self.fsm._current_state is self.states[1])
+		self.sender.emit('next')
+		self.loop.process_events()
+		self.assertTrue(self.fsm._current_state is self.states[2])
+
+	def test_stale_transition(self):
+		self._chain(True)
+		a, b, c = self.states
+		a.add_transition(self.sender, 'jump', c, asynchronous=False)
+		self.sender.emit('next')
+		self.sender.emit('jump')
+		self.loop.process_events()
+		# queued from A, which is no longer current
+		self.assertTrue(self.fsm._current_state is c)
+
+	def test_synchronous(self):
+		self._chain(False)
+		self.sender.emit('next')
+		self.assertTrue(self.fsm._current_state is self.states[1])
+		self.assertEqual(self.loop.get_queue_depth(), 0)
+
+	def test_remove_transition(self):
+		self._chain(True)
+		a, b, c = self.states
+		a.remove_transition('next')
+		self.assertEqual(self.fsm._subscriptions,
+					{(self.sender, 'next') : 1})
+		b.remove_transition('next')
+		self.assertEqual(self.fsm._subscriptions, {})
+		self.sender.emit('next')
+		self.assertEqual(self.loop.get_queue_depth(), 0)
+
+	def test_nested_machine(self):
+		inner = StateMachine('inner')
+		x, y = State('X'), State('Y')
+		for state in (x, y): inner.add_state(state)
+		inner.set_initial_state(x)
+		x.add_transition(self.sender, 'next', y, asynchronous=False)
+		a, b, c = self.states
+		self.fsm.add_state(inner)
+		a.add_transition(self.sender, 'enter', inner,
+						asynchronous=False)
+		self.fsm.start()
+		inner.start()
+		self.assertFalse(inner.is_receiving_events())
+		self.sender.emit('next')
+		self.assertTrue(inner._current_state is x)
+		self.sender.emit('enter')
+		self.assertTrue(inner.is_receiving_events())
+		self.sender.emit('next')
+		self.assertTrue(inner._current_state is y)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from nurse.base import Object
+from nurse.timer import TimerService
+
+
+class Sender(Object):
+	def __init__(self):
+		Object.__init__(self, 'sender')
+		self.received = []
+		self.connect('tick', self, 'on_tick', asynchronous=False)
+
+	def on_tick(self, event):
+		self.received.append(event.signal_data)
+
+
+class TestTimerService(unittest.TestCase):
+	def setUp(self):
+		self.timers = TimerService()
+		self.sender = Sender()
+
+	def test_one_shot(self):
+		timer = self.timers.add_timer(100., self.sender, 'tick', 'a')
+		self.timers.update(99.)
+		self.assertEqual(self.sender.received, [])
+		self.timers.update(100.)
+		self.timers.update(500.)
+		self.assertEqual(self.sender.received, ['a'])
+		self.assertFalse(timer.active)
+		self.assertEqual(len(self.timers), 0)
+
+	def test_periodic(self):
+		self.timers.add_timer(10., self.sender, 'tick', 'p', period=20.)
+		# late updates emit every missed period (up to max_catch_up)
+		self.timers.update(55.)
+		self.assertEqual(self.sender.received, ['p'] * 3)
+		self.timers.update(70.)
+		self.assertEqual(len(self.sender.received), 4)
+		self.assertRaises(ValueError, self.timers.add_timer, 10.,
+					self.sender, 'tick', period=0.)
+
+	def test_max_catch_up(self):
+		self.timers.max_catch_up = 2
+		timer = self.timers.add_timer(10., self.sender, 'tick', 'p',
+								period=20.)
+		# deadlines 10, 30, 50, 70, 90: 2 signals, others skipped
+		self.timers.update(95.)
+		self.assertEqual(self.sender.received, ['p'] * 2)
+		self.assertEqual(timer.deadline, 110.)
+		self.timers.update(110.)
+		self.assertEqual(self.sender.received, ['p'] * 3)
+
+	def test_order(self):
+		for data, delay in [('c', 30.), ('a', 10.), ('b', 30.)]:
+			self.timers.add_timer(delay, self.sender, 'tick', data)
+		self.timers.update(100.)
+		# same deadline: first added, first emitted
+		self.assertEqual(self.sender.received, ['a', 'c', 'b'])
+
+	def test_cancel(self):
+		timers = [self.timers.add_timer(10., self.sender, 'tick', i) \
+							for i in range(4)]
+		timers[1].cancel()
+		timers[1].cancel()
+		self.assertEqual(len(self.timers), 3)
+		self.timers.update(10.)
+		self.assertEqual(self.sender.received, [0, 2, 3])
+		self.assertEqual(len(self.timers._heap), 0)
+
+	def test_compaction(self):
+		timers = [self.timers.add_timer(1000. + i, self.sender, 'tick',
+							i) for i in range(100)]
+		for timer in timers[:64]: timer.cancel()
+		# cancelled timers are still in the heap
+		self.assertEqual(len(self.timers._heap), 100)
+		timers[64].cancel()
+		self.assertEqual(len(self.timers._heap), 35)
+		self.assertEqual(len(self.timers), 35)
+		self.timers.update(2000.)
+		self.assertEqual(self.sender.received, range(65, 100))
+
+
+if __name__ == '__main__':
+	unittest.main()